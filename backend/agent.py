@@ -1,26 +1,34 @@
 import asyncio
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime
 
 from semantic_kernel import Kernel
 from semantic_kernel.utils.logging import setup_logging
 from semantic_kernel.functions import kernel_function
-from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
-from semantic_kernel.connectors.ai.ollama import OllamaChatCompletion
 from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
+from semantic_kernel.filters import FilterTypes, AutoFunctionInvocationContext
 from semantic_kernel.agents import ChatCompletionAgent, ChatHistoryAgentThread
 from semantic_kernel.contents.utils.author_role import AuthorRole
 
-from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
 from semantic_kernel.contents.chat_history import ChatHistory
 from semantic_kernel.functions.kernel_arguments import KernelArguments
+from semantic_kernel.functions.function_result import FunctionResult
 from semantic_kernel.contents import ChatMessageContent, StreamingChatMessageContent, FunctionCallContent, FunctionResultContent
 
-from semantic_kernel.connectors.ai.open_ai.prompt_execution_settings.azure_chat_prompt_execution_settings import (
-    AzureChatPromptExecutionSettings,
-)
-from semantic_kernel.contents import ChatHistorySummarizationReducer
-
-from semantic_kernel.connectors.mcp import MCPStreamableHttpPlugin, MCPSsePlugin
+from history_reducer import TokenBudgetReducer
+from model_routing import TieredChatCompletion
+
+from mcp_sessions import mcp_sessions
+from agent_pool import deployment_key
+from rate_limiter import RateLimitTimeout, rate_limiters
+from startup import startup
+from prefetch import PREFETCH_ENABLED, PREFETCH_TOOL, seed_urls
+from budget import AGENT_BUDGET_SECONDS, AGENT_BUDGET_TOKENS, FINISH_INSTRUCTION, RunBudget
+from batch import results_from_tools
+from sessions import Session
+from tool_cache import FailedToolCall, ToolResultCache, current_tool_cache
+from tracing import metrics, span
+from http_clients import http_clients
 
 import logging
 import json
@@ -32,10 +40,64 @@ async def test(agent):
     logging.info(f'{[{"role": message.role, "content": message.content} for message in agent.thread._chat_history.messages]}')
     logging.info("\n\n\nTest completed\n\n\n")
 
+# Characters of each tool result included in streamed tool_result events
+TOOL_RESULT_SUMMARY_CHARS = 300
+# Tool result the model sees for calls skipped because the run's budget is used up
+BUDGET_SKIPPED = "Not run: the time and token budget for this request is used up."
+# Default cap on tool calls running at once within one agent run ("max_parallel_tool_calls")
+MAX_PARALLEL_TOOL_CALLS = int(os.getenv("MAX_PARALLEL_TOOL_CALLS", "8"))
+# Prefetches left running for other runs of a batch; referenced here so they are not garbage collected
+_background_tasks: set[asyncio.Task] = set()
+# How SK words the result of a tool call that raised; such results are not cached
+TOOL_ERROR_PREFIX = "An error occurred while invoking the function"
+
+
+def _prefetch_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    # A failed prefetch was already logged by the tool; the model's own call retries it
+    if not task.cancelled():
+        task.exception()
+
+
+class _ResultOrder:
+    """Releases the tool calls of one model turn in the order the model issued them.
+
+    SK runs a turn's calls concurrently and appends each result to the chat history
+    as soon as its filter returns; holding each call until the earlier ones are
+    through keeps the history in call order.
+
+    Only calls that entered the filter are waited for. SK answers a call to an unknown
+    tool, or one with bad arguments, itself without running the filter. It starts the
+    calls in order, and each one enters the filter or is answered before the next
+    starts, so a call entering knows every earlier call that ever will.
+    """
+
+    def __init__(self, message):
+        # The turn's assistant message, kept so its id is not reused while the turn runs
+        self.message = message
+        self.entered: set[int] = set()
+        self.released: set[int] = set()
+        self.condition = asyncio.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.released == self.entered
+
+    async def wait_for_turn(self, position: int):
+        async with self.condition:
+            await self.condition.wait_for(
+                lambda: all(earlier in self.released for earlier in self.entered if earlier < position)
+            )
+            self.released.add(position)
+            self.condition.notify_all()
+
+
 class Agent:
     def __init__(self, agent_definition: dict):
         # Initialize the kernel
         self.service_id = agent_definition.get("name", "Agent")
+        # "endpoint|deployment" of the model backend, used to share rate and concurrency limits
+        self.deployment = None
 
         self.kernel = Kernel()
         self._setup_chat_completion(agent_definition)
@@ -44,24 +106,31 @@ class Agent:
 
         self.system_message = agent_definition.get("system_message", "You are a helpful assistant. Use your tools to assist users.")
         logging.debug(f"System message: {self.system_message}")
-        
-
-        # Suppose chat_service is your AzureChatCompletion service instance
-        self.chat_history_reducer = ChatHistorySummarizationReducer(
-            service=self.chat_completion,
-            target_count=7,               # keep most recent messages in detail
-            threshold_count=5,             # allow a few extra before reducing
-            auto_reduce=True,              # auto-summarize when using async adds
-            include_function_content_in_summary=True, # summarize function content
-            system_message=self.system_message   
-        )
-
 
+        # History budget; the reducer only summarizes once elided history still exceeds it
+        self.max_history_tokens = agent_definition.get("max_history_tokens", 8000)
+        self.target_message_count = agent_definition.get("target_message_count", 7)
 
-        self.thread = ChatHistoryAgentThread(chat_history=self.chat_history_reducer)
+        self.reset_thread()
 
         self.mcp_server_objects = []
 
+        # Set per run by stream_agent; tool-call events are pushed here while it is active
+        self._event_queue = None
+        # Tool calls of a single turn run concurrently, bounded per run here and per server in mcp_sessions
+        self._tool_semaphore = asyncio.Semaphore(agent_definition.get("max_parallel_tool_calls", MAX_PARALLEL_TOOL_CALLS))
+        self._result_orders: dict[int, _ResultOrder] = {}
+        # "prefetch": false turns speculative fetching off for this agent; a dict overrides tool, arguments, sources
+        prefetch = agent_definition.get("prefetch", {})
+        self.prefetch = prefetch if PREFETCH_ENABLED and isinstance(prefetch, dict) else None
+        # Cache keys of this run's prefetched pages that the model has not asked for yet
+        self._prefetched: dict[str, str] = {}
+        # Time and token allowance of each run's tool loop; the current run's budget while one is active
+        self.budget_seconds = agent_definition.get("budget_seconds", AGENT_BUDGET_SECONDS)
+        self.budget_tokens = agent_definition.get("budget_tokens", AGENT_BUDGET_TOKENS)
+        self._budget: RunBudget | None = None
+        self.kernel.add_filter(FilterTypes.AUTO_FUNCTION_INVOCATION, self._auto_function_invocation_filter)
+
         self._setup_logging()
         settings = self.kernel.get_prompt_execution_settings_from_service_id(service_id=self.service_id)
         # Configure the function choice behavior to auto invoke kernel functions
@@ -71,6 +140,10 @@ class Agent:
         logging.debug(f"LLM settings: {settings}")
 
 
+        # Settings of the last turn of a run over budget: tools stay described but cannot be called
+        self._finish_settings = settings.model_copy()
+        self._finish_settings.function_choice_behavior = FunctionChoiceBehavior.NoneInvoke()
+
         self.agent = ChatCompletionAgent(
             kernel = self.kernel, 
             name = agent_definition.get("name", "Agent"),
@@ -79,6 +152,267 @@ class Agent:
             arguments = KernelArguments(settings = settings)
             )
 
+    def reset_thread(self):
+        """Give the agent a fresh reducer and thread so it can serve a new request.
+
+        Everything else (kernel, chat service, plugins, execution settings) is kept,
+        which is what allows pooled agents to be reused across requests.
+        """
+        # Suppose chat_service is your AzureChatCompletion service instance
+        self.chat_history_reducer = TokenBudgetReducer(
+            service=self.summarizer,
+            max_tokens=self.max_history_tokens,
+            target_count=self.target_message_count,  # messages kept in detail if we do summarize
+            threshold_count=5,             # allow a few extra before reducing
+            auto_reduce=True,              # auto-summarize when using async adds
+            include_function_content_in_summary=True, # summarize function content
+            system_message=self.system_message   
+        )
+
+        self.thread = ChatHistoryAgentThread(chat_history=self.chat_history_reducer)
+        # Finished tool calls of the current run by _call_key; SK only adds a turn's results to the thread once the turn ends
+        self._tool_results: dict[str, dict] = {}
+
+    async def _emit(self, event: str, data: dict):
+        if self._event_queue is not None:
+            await self._event_queue.put((event, data))
+
+    @staticmethod
+    def _call_key(message, position: int, call: FunctionCallContent) -> str:
+        """Identifies a tool call within a run; Ollama's calls have no id, so those fall back to their place in the turn."""
+        return call.id or f"{id(message)}:{position}"
+
+    def _result_order(self, context: AutoFunctionInvocationContext) -> tuple[str, int, _ResultOrder]:
+        """Find this call's key and position in its turn, and enter the turn's shared gate."""
+        call = context.function_call_content
+        # The turn's assistant message holds this very FunctionCallContent
+        for message in reversed(context.chat_history.messages):
+            calls = [item for item in message.items if isinstance(item, FunctionCallContent)]
+            position = next((i for i, item in enumerate(calls) if item is call), None)
+            if position is not None:
+                break
+        else:
+            message, position = call, 0
+        order = self._result_orders.setdefault(id(message), _ResultOrder(message))
+        order.entered.add(position)
+        return self._call_key(message, position, call), position, order
+
+    async def _invoke_tool(self, context: AutoFunctionInvocationContext, next):
+        """Invoke the tool, going through the shared tool-result cache when one is active."""
+        cache = current_tool_cache.get()
+        if cache is None:
+            await next(context)
+            return
+
+        async def call():
+            await next(context)
+            if self._failed(context.function_result):
+                raise FailedToolCall(context.function_result)
+            return context.function_result
+
+        call_content = context.function_call_content
+        key = cache.key(call_content.plugin_name, call_content.function_name, call_content.arguments,
+                        self._tool_defaults(context.function))
+        url = self._prefetched.pop(key, None)
+        if url is not None:
+            metrics.inc("friday_prefetch_total", outcome="used")
+            logging.info(f"Model asked for prefetched {url}")
+        try:
+            context.function_result = await cache.get_or_call(key, call)
+        except FailedToolCall as e:
+            # The model sees the failure, but the next identical call tries again
+            context.function_result = e.result
+
+    @classmethod
+    def _failed(cls, result: FunctionResult | None) -> bool:
+        """Whether a tool call failed: SK caught an exception, or the tool answered with an error object."""
+        text = cls._result_text(result.value if result else None)
+        if text is None:
+            return False
+        if text.startswith(TOOL_ERROR_PREFIX):
+            return True
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return False
+        return isinstance(data, dict) and "error" in data
+
+    @staticmethod
+    def _tool_defaults(function) -> dict:
+        return {
+            parameter.name: parameter.default_value
+            for parameter in function.metadata.parameters if parameter.default_value is not None
+        }
+
+    def _prefetch_function(self):
+        tool = self.prefetch.get("tool", PREFETCH_TOOL)
+        for plugin in self.kernel.plugins.values():
+            if tool in plugin.functions:
+                return plugin.functions[tool]
+        return None
+
+    async def _prefetch_call(self, function, arguments: dict):
+        with span("prefetch", function.name, url=arguments.get("url")):
+            result = await function.invoke(self.kernel, KernelArguments(**arguments))
+        if self._failed(result):
+            raise FailedToolCall(result)
+        return result
+
+    @asynccontextmanager
+    async def _prefetching(self, user_input: str):
+        """Fetch the pages the query names while the first model turn is in flight.
+
+        Results go into the tool-result cache (the batch's, or one for this run), so the
+        model's own call for the same page and arguments is a cache hit.
+        """
+        function = self._prefetch_function() if self.prefetch is not None else None
+        seeds = seed_urls(user_input, self.prefetch.get("sources")) if function else []
+        if not seeds:
+            yield
+            return
+
+        cache = current_tool_cache.get()
+        token = None
+        if cache is None:
+            cache = ToolResultCache()
+            token = current_tool_cache.set(cache)
+        defaults = self._tool_defaults(function)
+        tasks = []
+        for url in seeds:
+            arguments = {**self.prefetch.get("arguments", {}), "url": url}
+            key = cache.key(function.plugin_name, function.name, arguments, defaults)
+            self._prefetched[key] = url
+            tasks.append(asyncio.create_task(cache.get_or_call(key, lambda arguments=arguments: self._prefetch_call(function, arguments))))
+        logging.info(f"Prefetching {seeds} with {function.name}")
+        try:
+            yield
+        finally:
+            if token is not None:
+                current_tool_cache.reset(token)
+                # Nobody else can use this run's cache, so stop fetches the model never asked for
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            else:
+                # A batch's or session's cache outlives this run and its other users may still want these
+                for task in tasks:
+                    _background_tasks.add(task)
+                    task.add_done_callback(_prefetch_done)
+            metrics.inc("friday_prefetch_total", len(self._prefetched), outcome="unused")
+            self._prefetched = {}
+
+    @asynccontextmanager
+    async def _in_session(self, session: Session | None):
+        """Continue `session`: start from its saved thread and share its tool results."""
+        if session is None:
+            yield
+            return
+        self.chat_history_reducer.messages = list(session.messages)
+        token = current_tool_cache.set(session.tool_cache)
+        try:
+            yield
+        finally:
+            current_tool_cache.reset(token)
+
+    @asynccontextmanager
+    async def _budgeted(self, deadline: float | None):
+        """Give the run a fresh budget, capped by its deadline, for the tool filter and the step loop to check."""
+        self._budget = RunBudget(self.budget_seconds, self.budget_tokens, deadline)
+        try:
+            yield self._budget
+        finally:
+            self._budget = None
+
+    def _over_budget(self, context: AutoFunctionInvocationContext) -> bool:
+        """Count the model turn that issued this call and decide whether the call may still run.
+
+        Once the budget runs low the turn's calls still run, but end SK's tool loop so the
+        model is asked to answer next; once it is used up they are skipped as well.
+        """
+        budget = self._budget
+        if budget is None or not budget.limited:
+            return False
+        if context.function_sequence_index == 0:
+            messages = context.chat_history.messages
+            for index in range(len(messages) - 1, -1, -1):
+                if any(isinstance(item, FunctionCallContent) for item in messages[index].items):
+                    budget.spend(messages[index], messages[:index])
+                    break
+        if budget.low():
+            budget.stopped = True
+            context.terminate = True
+        return budget.exhausted()
+
+    @contextmanager
+    def _without_tools(self):
+        """Run the agent with settings that describe the tools but do not let the model call them.
+
+        Not passed as override arguments: SK merges those into the agent's own settings in place.
+        """
+        arguments = self.agent.arguments
+        self.agent.arguments = KernelArguments(settings=self._finish_settings)
+        try:
+            yield
+        finally:
+            self.agent.arguments = arguments
+
+    async def _finish(self, budget: RunBudget):
+        """Last turn of a run over budget: the model answers from what it has, without tools.
+
+        Returns None, making no call, when the budget is already used up.
+        """
+        if budget.exhausted():
+            logging.warning(f"Agent {self.service_id} used up its budget ({budget.to_dict()}), returning what it gathered")
+            return None
+        logging.info(f"Agent {self.service_id} is running low on budget ({budget.to_dict()}), asking it to answer")
+        with self._without_tools():
+            response = await self.agent.get_response(
+                messages=ChatMessageContent(role=AuthorRole.SYSTEM, content=FINISH_INSTRUCTION),
+                thread=self.thread,
+            )
+        budget.spend(response.message)
+        return response
+
+    async def _auto_function_invocation_filter(self, context: AutoFunctionInvocationContext, next):
+        """Kernel filter wrapped around every tool call the model makes."""
+        call = context.function_call_content
+        key, position, order = self._result_order(context)
+        await self._emit("tool_call", {
+            "name": call.function_name,
+            "plugin": call.plugin_name,
+            "arguments": call.arguments,
+        })
+        try:
+            if self._over_budget(context):
+                result = BUDGET_SKIPPED
+                context.function_result = FunctionResult(
+                    function=context.function.metadata, value=result, metadata={"arguments": context.arguments},
+                )
+            else:
+                async with self._tool_semaphore:
+                    with span("tool", call.function_name, plugin=call.plugin_name) as attributes:
+                        await self._invoke_tool(context, next)
+                        result = self._result_text(context.function_result.value if context.function_result else None) or ""
+                        attributes["result_chars"] = len(result)
+            self._tool_results[key] = {"name": call.function_name, "arguments": call.parse_arguments(), "results": result}
+            await self._emit("tool_result", {
+                "name": call.function_name,
+                "plugin": call.plugin_name,
+                "length": len(result),
+                "summary": result[:TOOL_RESULT_SUMMARY_CHARS],
+            })
+        finally:
+            await order.wait_for_turn(position)
+            if order.done:
+                self._result_orders.pop(id(order.message), None)
+
+    async def close(self):
+        """Drop this agent's references to its MCP plugins.
+
+        The underlying sessions are shared through `mcp_sessions` and outlive the agent.
+        """
+        self.mcp_server_objects = []
+
     def _setup_logging(self, loglevel = logging.INFO):
         # Get the root logger to ensure we use the existing configuration
         root_logger = logging.getLogger()
@@ -126,31 +460,29 @@ class Agent:
                 logging.warning(f"No URL provided for server {server_name}, skipping")
                 continue
             
-            mcp_server = None
-            if "/mcp" in server_url:
-                mcp_server = MCPStreamableHttpPlugin(
-                    name=server_name,
-                    url=server_url,
-                )
-            elif "/sse" in server_url:
-                mcp_server = MCPSsePlugin(
-                    name=server_name,
-                    url=server_url,
-                )
-            else:
+            if "/mcp" not in server_url and "/sse" not in server_url:
                 logging.warning(f"Unknown server type '{server_type}' for server {server_name}, skipping")
                 continue
-            
-            if mcp_server:
-                try:
-                    await mcp_server.connect()
-                    self.available_tools = await mcp_server.session.list_tools()
-                    self.kernel.add_plugin(mcp_server)
-                    self.mcp_server_objects.append(mcp_server)
-                    logging.info(f"Successfully connected to MCP server: {server_name} ({server_type})")
-                    await mcp_server.close()
-                except Exception as e:
-                    logging.error(f"Error connecting to {server_name} MCP server: {e}")
+
+            try:
+                # Long-lived session shared with every other agent using this server
+                mcp_server = await mcp_sessions.acquire(server_name, server_url, server.get("max_concurrency"))
+                self.kernel.add_plugin(mcp_server)
+                self.mcp_server_objects.append(mcp_server)
+                logging.info(f"Using pooled MCP session: {server_name} ({server_type})")
+            except Exception as e:
+                logging.error(f"Error connecting to {server_name} MCP server: {e}")
+
+    @staticmethod
+    def _connector_modules(agent_definition: dict) -> list[str]:
+        # Best guess before env overrides are applied; a miss only means the import happens inline
+        modules = []
+        for definition in [agent_definition, *agent_definition.get("models", {}).values()]:
+            azure = "env_file_path" in definition or "azure" in definition.get("endpoint", "")
+            modules.append("azure_chat" if azure else "semantic_kernel.connectors.ai.ollama")
+        if agent_definition.get("servers"):
+            modules.append("semantic_kernel.connectors.mcp")
+        return modules
 
     @classmethod
     async def create(cls, agent_definition: dict):
@@ -159,6 +491,8 @@ class Agent:
         Usage:
             agent = await Agent.create(agent_definition)
         """
+        for module in cls._connector_modules(agent_definition):
+            await startup.import_in_thread(module)
         inst = cls(agent_definition)
         logging.info("Created agent instance...")
         
@@ -170,13 +504,19 @@ class Agent:
 
         return inst
 
-    async def run_agent(self, user_input: str):
+    async def run_agent(self, user_input: str, session: Session | None = None, deadline: float | None = None):
+        """Run one request to completion; with a `session`, as the next turn of that conversation.
+
+        At `deadline` (event-loop time) the model call and tool calls in flight are
+        cancelled and whatever the run gathered so far is returned, marked partial.
+        A run that runs low on its time or token budget is asked to answer with what it
+        has, and its result is marked truncated.
+        """
         response = None  # Initialize response to avoid UnboundLocalError
+        timeout = asyncio.timeout_at(deadline)
 
         try:
             logging.info(f"Running agent with user input: {user_input}")
-            for server in self.mcp_server_objects:
-                await server.connect()
 
             # async for response in self.agent.invoke(messages=user_input, 
             #                                         thread=self.thread,
@@ -200,24 +540,25 @@ class Agent:
             #         else:
             #             logging.info("No reduction")
             
-            # 1) First step: send the user input
-            response = await self.agent.get_response(messages=user_input, thread=self.thread)
-            await self.chat_history_reducer.reduce()  # summarize/truncate before the next step
-            await test(self)
-            # 2) Continue stepping until the model returns a final, non-tool answer
-            while True:
-                # No new user message; let the agent continue the tool loop 1 step at a time
-                response = await self.agent.get_response(messages=None, thread=self.thread)
-                # You can inspect response.message.items here if you wish
-                await self.chat_history_reducer.reduce()
-
-                # (Optional) detect finality (no further tool calls)
-                logging.info(f"Agent response: {response}")
+            async with timeout, self._budgeted(deadline) as budget, self._in_session(session), self._prefetching(user_input):
+                # 1) First step: send the user input
+                response = await self.agent.get_response(messages=user_input, thread=self.thread)
+                await self.chat_history_reducer.reduce()  # summarize/truncate before the next step
                 await test(self)
-                msg = response.message
-                has_tool_call = any(isinstance(x, FunctionCallContent) for x in (msg.items or []))
-                if not has_tool_call and msg.role.name.lower() == "assistant":
-                    break
+                # 2) Continue stepping until the model returns a final, non-tool answer
+                while not self._is_answer(response):
+                    if budget.stopped or budget.low():
+                        # Wrap up with what has been gathered rather than start another round of tools
+                        budget.stopped = True
+                        response = await self._finish(budget)
+                        break
+                    # No new user message; let the agent continue the tool loop 1 step at a time
+                    response = await self.agent.get_response(messages=None, thread=self.thread)
+                    # You can inspect response.message.items here if you wish
+                    await self.chat_history_reducer.reduce()
+
+                    logging.info(f"Agent response: {response}")
+                    await test(self)
 
 
             # Display messages from the agent thread (agent.thread.get_messages() is an async generator)
@@ -229,92 +570,272 @@ class Agent:
                     logging.info(f"\t{message.items[0].function_name}: \n\targs: {message.items[0].metadata['arguments']}")
                 else:
                     logging.info(f"\t{message.content[:50]}")
+        except TimeoutError as e:
+            if not timeout.expired():
+                return self._error_response(e)
+            # The thread may end in tool calls that never got results, so it is not kept in the session
+            return self._partial_response(self._response_content(response))
+        except Exception as e:
+            return self._error_response(e)
+
+        content = self._response_content(response)
+        response_dict = self._truncated_response(content, budget) if budget.stopped else self._build_response(content)
+        if session is not None:
+            session.save(self.thread._chat_history.messages)
+
+        if self.thread:
+            await self.thread.delete()
+        return response_dict
+
+    async def stream_agent(self, user_input: str, heartbeat: float = 15.0, session: Session | None = None,
+                           deadline: float | None = None):
+        """Run the agent and yield (event, data) tuples as the run progresses.
 
-            for server in self.mcp_server_objects:
-                # Attempt to close the server connection gracefully
+        Events are `tool_call` and `tool_result` for each tool invocation, `token` for
+        model output as it arrives, `ping` when nothing has happened for `heartbeat`
+        seconds, and finally either `final` (same payload as run_agent) or `error`.
+        A run stopped at `deadline` ends with a partial `final`, or `error` if it had nothing.
+        """
+        queue = asyncio.Queue()
+        done = object()
+
+        async def produce():
+            # Text of the current model turn; the final answer is the last turn's text only, as in run_agent
+            chunks = []
+
+            async def on_intermediate_message(message: ChatMessageContent):
+                # A turn's tool results arrive before the next turn starts: the text streamed so far was not the answer
+                if any(isinstance(item, FunctionResultContent) for item in message.items):
+                    chunks.clear()
+
+            timeout = asyncio.timeout_at(deadline)
+            try:
+                logging.info(f"Streaming agent with user input: {user_input}")
+                async with timeout, self._budgeted(deadline) as budget, self._in_session(session), self._prefetching(user_input):
+                    async for response in self.agent.invoke_stream(messages=user_input, thread=self.thread,
+                                                                   on_intermediate_message=on_intermediate_message):
+                        text = response.message.content
+                        if text:
+                            chunks.append(text)
+                            await queue.put(("token", {"text": text}))
+                    if budget.stopped:
+                        # The tool loop was cut short; stream the answer from what has been gathered
+                        chunks.clear()
+                        if not budget.exhausted():
+                            with self._without_tools():
+                                async for response in self.agent.invoke_stream(
+                                    messages=ChatMessageContent(role=AuthorRole.SYSTEM, content=FINISH_INSTRUCTION),
+                                    thread=self.thread,
+                                ):
+                                    if response.message.content:
+                                        chunks.append(response.message.content)
+                                        await queue.put(("token", {"text": response.message.content}))
+                content = "".join(chunks) or None
+                final = self._truncated_response(content, budget) if budget.stopped else self._build_response(content)
+                if session is not None:
+                    session.save(self.thread._chat_history.messages)
+                await queue.put(("final", final))
+            except TimeoutError as e:
+                if not timeout.expired():
+                    await queue.put(("error", self._error_response(e)))
+                else:
+                    result = self._partial_response("".join(chunks) or None)
+                    await queue.put(("error" if "status_code" in result else "final", result))
+            except Exception as e:
+                await queue.put(("error", self._error_response(e)))
+            finally:
+                await queue.put(done)
+
+        self._event_queue = queue
+        task = asyncio.create_task(produce())
+        try:
+            while True:
                 try:
-                    logging.debug(f"Closing MCP server connection: {server.name}")
-                    await server.close()
-                except Exception as e:
-                    logging.error(f"Failed to close server connection: {e}")
-        except Exception as e:
-            # Best-effort cleanup; ignore errors
-            if "429" in str(e) or "rate_limit_exceeded" in str(e).lower():
-                logging.warning(f"Rate limit exceeded for agent {self.service_id}: {e}")
-                return {"status_code": 429, "response": {
-                    "error": "Rate limit exceeded. Please try again later."
-                }}
-            else:
-                logging.error(f"Error running agent {self.service_id}: {e}")
-                return {"error": "An error occurred while processing your request"}
-        
-        response_dict = {
-            "response": response.content.content if response and hasattr(response, 'content') and hasattr(response.content, 'content') else "No response",
+                    item = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield "ping", {}
+                    continue
+                if item is done:
+                    break
+                yield item
+        finally:
+            self._event_queue = None
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+            if self.thread:
+                await self.thread.delete()
+
+    @staticmethod
+    def _is_rate_limited(e: BaseException | None) -> bool:
+        while e is not None:
+            if isinstance(e, RateLimitTimeout) or getattr(e, "status_code", None) == 429:
+                return True
+            e = e.__cause__ or e.__context__
+        return False
+
+    def _error_response(self, e: Exception) -> dict:
+        # Only reached once the rate limiter has run out of time to wait a 429 out
+        if self._is_rate_limited(e) or "429" in str(e) or "rate_limit_exceeded" in str(e).lower():
+            logging.warning(f"Rate limit exceeded for agent {self.service_id}: {e}")
+            return {"status_code": 429, "response": {
+                "error": "Rate limit exceeded. Please try again later."
+            }}
+        logging.error(f"Error running agent {self.service_id}: {e}")
+        return {"error": "An error occurred while processing your request"}
+
+    def _stopped_response(self, content: str | None) -> dict:
+        """Result of a run stopped early: the model's answer if it gave one, else the articles its tools extracted."""
+        result = self._build_response(content)
+        # A turn's calls and results reach the thread together, so a call in the thread has its result there too
+        in_thread = {
+            self._call_key(message, position, call) for message in self.thread._chat_history.messages
+            for position, call in enumerate(item for item in message.items if isinstance(item, FunctionCallContent))
+        }
+        result["tools_called"] += [tool for key, tool in self._tool_results.items() if key not in in_thread]
+        if content is None:
+            assembled = results_from_tools(result["tools_called"])
+            if assembled:
+                result["response"] = json.dumps(assembled)
+        return result
+
+    def _truncated_response(self, content: str | None, budget: RunBudget) -> dict:
+        metrics.inc("friday_budget_truncated_total", agent=self.service_id, answered=str(content is not None).lower())
+        return {**self._stopped_response(content), "truncated": True, "budget": budget.to_dict()}
+
+    def _partial_response(self, content: str | None) -> dict:
+        """What a run stopped at its deadline had gathered; a 504 error result when that is nothing."""
+        result = self._stopped_response(content)
+        partial = content is not None or bool(result["tools_called"])
+        metrics.inc("friday_requests_cancelled_total", reason="deadline", partial=str(partial).lower())
+        logging.warning(f"Agent {self.service_id} hit its deadline with {len(result['tools_called'])} tool result(s)")
+        if not partial:
+            return {"status_code": 504, "response": {"error": "Request deadline exceeded"}}
+        return {**result, "partial": True}
+
+    @staticmethod
+    def _is_answer(response) -> bool:
+        """Whether a step ended with the model's answer rather than tool calls or tool results."""
+        msg = response.message
+        has_tool_call = any(isinstance(x, FunctionCallContent) for x in (msg.items or []))
+        return not has_tool_call and msg.role.name.lower() == "assistant"
+
+    @staticmethod
+    def _response_content(response) -> str | None:
+        return response.content.content if response and hasattr(response, 'content') and hasattr(response.content, 'content') else None
+
+    @staticmethod
+    def _result_text(result) -> str | None:
+        # MCP tools return a list of content items; failed invocations carry a plain error string
+        if not result:
+            return None
+        if isinstance(result, list):
+            return getattr(result[0], "text", str(result[0]))
+        return str(result)
+
+    def _build_response(self, content: str | None) -> dict:
+        return {
+            "response": content if content is not None else "No response",
             "chat_history": [{"role": message.role, "content": message.content} for message in self.thread._chat_history.messages] if self.thread else [],
             "tools_called": [
                 {
                     "name": item.function_name,
                     "arguments": item.metadata.get("arguments", None),
-                    "results": getattr(item, "result", [None])[0].text if hasattr(item, "result") and item.result else None
+                    "results": self._result_text(item.result),
                 }
                 for message in (self.thread._chat_history.messages if self.thread else []) if message.items
                 for item in message.items if isinstance(item, FunctionResultContent)
             ],
         }
 
-        if self.thread:
-            await self.thread.delete()
-        return response_dict
-
     def _setup_chat_completion(self, agent_definition):
-        """Setup the chat completion service based on agent definition."""
-        try:
-            if "env_file_path" in agent_definition:
-                logging.info(f"Loading environment variables from {agent_definition['env_file_path']}")
-                # Load environment variables from .env file
-                load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), agent_definition['env_file_path']))
-
-                # Override agent_definition with environment variables if they exist
-                if os.getenv("AZURE_OPENAI_ENDPOINT"):
-                    agent_definition["endpoint"] = os.getenv("AZURE_OPENAI_ENDPOINT")
-                if os.getenv("AZURE_OPENAI_API_KEY"):
-                    agent_definition["api_key"] = os.getenv("AZURE_OPENAI_API_KEY")
-                if os.getenv("AZURE_OPENAI_MODEL"):
-                    agent_definition["deployment_name"] = os.getenv("AZURE_OPENAI_MODEL")
-                if os.getenv("OPENAI_API_VERSION"):
-                    agent_definition["api_version"] = os.getenv("OPENAI_API_VERSION")\
-                    
-                logging.info(f"Azure OpenAI endpoint: {agent_definition.get('endpoint', None)}")
-            if "azure" in agent_definition.get("endpoint", ""):
-                logging.info("Configuring Azure OpenAI Chat Completion")
-                
-                self.chat_completion = AzureChatCompletion(
-                    service_id=agent_definition.get("service_id", "Agent"),
-                    api_key=agent_definition.get("api_key", None),
-                    deployment_name=agent_definition.get("deployment_name", None),
-                    endpoint=agent_definition.get("endpoint", None),
-                    base_url=agent_definition.get("base_url", None),
-                    api_version=agent_definition.get("api_version", None),
-                    ad_token=agent_definition.get("ad_token", None),
-                    ad_token_provider=agent_definition.get("ad_token_provider", None),
-                    token_endpoint=agent_definition.get("token_endpoint", None),
-                    default_headers=agent_definition.get("default_headers", None),
-                    async_client=agent_definition.get("async_client", None),
-                    env_file_path=agent_definition.get("env_file_path", None),
-                    env_file_encoding=agent_definition.get("env_file_encoding", None),
-                    instruction_role=agent_definition.get("instruction_role", None),
-                )
+        """Setup the chat completion services based on agent definition.
 
-            else:
-                logging.info("Configuring Ollama Chat Completion")
-                self.chat_completion = OllamaChatCompletion(
-                    ai_model_id=agent_definition.get("deployment_name", "gpt-oss:20b"),
-                    host=agent_definition.get("endpoint", "http://localhost:11434"), # Default to local Ollama Instance
-                )
+        "models" can give a role its own model definition (same keys as an agent's endpoint
+        settings): "final" answers, "triage" takes the tool-calling turns and "summarizer"
+        condenses the history. Roles without one use the agent's own model.
+        """
+        try:
+            models = agent_definition.get("models", {})
+            final, self.deployment = self._create_chat_service(models.get("final", agent_definition))
+            self.chat_completion = final
+            self.summarizer = final
+            if "summarizer" in models:
+                self.summarizer, _ = self._create_chat_service(models["summarizer"])
+            if "triage" in models:
+                triage, _ = self._create_chat_service(models["triage"])
+                self.chat_completion = TieredChatCompletion(final=final, triage=triage)
             logging.info(f"Chat completion service configured: {self.chat_completion.__class__.__name__}")
         except Exception as e:
             logging.error(f"Failed to setup chat completion: {e}")
 
+    def _create_chat_service(self, agent_definition: dict):
+        """Build the chat completion service a (role) definition describes; returns it with its "endpoint|deployment" key."""
+        if "env_file_path" in agent_definition:
+            logging.info(f"Loading environment variables from {agent_definition['env_file_path']}")
+            # Load environment variables from .env file
+            load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), agent_definition['env_file_path']))
+
+            # Override agent_definition with environment variables if they exist
+            if os.getenv("AZURE_OPENAI_ENDPOINT"):
+                agent_definition["endpoint"] = os.getenv("AZURE_OPENAI_ENDPOINT")
+            if os.getenv("AZURE_OPENAI_API_KEY"):
+                agent_definition["api_key"] = os.getenv("AZURE_OPENAI_API_KEY")
+            if os.getenv("AZURE_OPENAI_MODEL"):
+                agent_definition["deployment_name"] = os.getenv("AZURE_OPENAI_MODEL")
+            if os.getenv("OPENAI_API_VERSION"):
+                agent_definition["api_version"] = os.getenv("OPENAI_API_VERSION")\
+                
+            logging.info(f"Azure OpenAI endpoint: {agent_definition.get('endpoint', None)}")
+        if "azure" in agent_definition.get("endpoint", ""):
+            logging.info("Configuring Azure OpenAI Chat Completion")
+            # Provider connectors are imported on first use; only deployments that need them pay for it
+            RateLimitedAzureChatCompletion = startup.timed_import("azure_chat").RateLimitedAzureChatCompletion
+            service = RateLimitedAzureChatCompletion(
+                service_id=agent_definition.get("service_id", "Agent"),
+                api_key=agent_definition.get("api_key", None),
+                deployment_name=agent_definition.get("deployment_name", None),
+                endpoint=agent_definition.get("endpoint", None),
+                base_url=agent_definition.get("base_url", None),
+                api_version=agent_definition.get("api_version", None),
+                ad_token=agent_definition.get("ad_token", None),
+                ad_token_provider=agent_definition.get("ad_token_provider", None),
+                token_endpoint=agent_definition.get("token_endpoint", None),
+                default_headers=agent_definition.get("default_headers", None),
+                async_client=agent_definition.get("async_client", None),
+                env_file_path=agent_definition.get("env_file_path", None),
+                env_file_encoding=agent_definition.get("env_file_encoding", None),
+                instruction_role=agent_definition.get("instruction_role", None),
+            )
+            deployment = deployment_key(agent_definition)
+            # Every agent on this deployment shares one limiter; the first definition seen sets its limits
+            rate_limiters.get(
+                deployment,
+                rpm=agent_definition.get("rate_limit_rpm"),
+                tpm=agent_definition.get("rate_limit_tpm"),
+                max_concurrency=agent_definition.get("max_concurrent_requests"),
+            )
+            service.rate_limit_key = deployment
+            if agent_definition.get("async_client") is None:
+                # Keep SK's auth and headers but send through the process-wide keep-alive pool for this endpoint
+                client = service.client
+                service.client = client.with_options(http_client=http_clients.get(str(client.base_url)))
+
+        else:
+            logging.info("Configuring Ollama Chat Completion")
+            host = agent_definition.get("endpoint", "http://localhost:11434") # Default to local Ollama Instance
+            OllamaChatCompletion = startup.timed_import("semantic_kernel.connectors.ai.ollama").OllamaChatCompletion
+            service = OllamaChatCompletion(
+                ai_model_id=agent_definition.get("deployment_name", "gpt-oss:20b"),
+                host=host,
+                client=http_clients.get_ollama(host),
+            )
+            deployment = deployment_key(agent_definition)
+        return service, deployment
+
 
 # Run the main function
 if __name__ == "__main__":
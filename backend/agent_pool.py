@@ -0,0 +1,437 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
+from dotenv import dotenv_values
+
+from startup import startup
+from tracing import span
+
+if TYPE_CHECKING:
+    from agent import Agent
+
+# Pool sizing, overridable per agent with "pool_size" / "pool_max_size" in agent_definition.json
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "2"))
+AGENT_POOL_MAX_SIZE = int(os.getenv("AGENT_POOL_MAX_SIZE", "8"))
+AGENT_POOL_IDLE_SECONDS = float(os.getenv("AGENT_POOL_IDLE_SECONDS", "600"))
+AGENT_POOL_CHECK_SECONDS = float(os.getenv("AGENT_POOL_CHECK_SECONDS", "30"))
+# "background" lets the API accept requests while the pools warm; "blocking" warms before start-up completes
+AGENT_POOL_WARM_ON_START = os.getenv("AGENT_POOL_WARM_ON_START", "background").lower()
+
+
+# Numeric settings an agent definition may carry, and whether zero is allowed
+_INT_FIELDS = {
+    "pool_size": 0,
+    "pool_max_size": 1,
+    "max_history_tokens": 1,
+    "target_message_count": 1,
+    "max_parallel_tool_calls": 1,
+    "max_concurrent_runs": 1,
+    "max_concurrent_requests": 1,
+    "budget_tokens": 0,
+}
+_NUMBER_FIELDS = ("cache_ttl_seconds", "rate_limit_rpm", "rate_limit_tpm", "request_timeout_seconds", "budget_seconds")
+_STRING_FIELDS = ("system_message", "endpoint", "deployment_name", "api_version", "env_file_path")
+# Roles that can be given their own model under "models"
+_MODEL_ROLES = ("final", "triage", "summarizer")
+
+
+class DefinitionError(ValueError):
+    """Raised when agent definitions fail validation; the running pools are left untouched."""
+
+    def __init__(self, errors: list[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def validate_definitions(definitions) -> list[str]:
+    """Return every problem found in a parsed agent_definition.json, or an empty list."""
+    if not isinstance(definitions, dict) or not definitions:
+        return ["definitions must be a non-empty JSON object of agent name -> definition"]
+
+    errors = []
+    for name, definition in definitions.items():
+        if not isinstance(definition, dict):
+            errors.append(f"{name}: definition must be an object")
+            continue
+        for field in _STRING_FIELDS:
+            if field in definition and not isinstance(definition[field], str):
+                errors.append(f"{name}: {field} must be a string")
+        for field, minimum in _INT_FIELDS.items():
+            value = definition.get(field)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < minimum):
+                errors.append(f"{name}: {field} must be an integer >= {minimum}")
+        for field in _NUMBER_FIELDS:
+            value = definition.get(field)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0):
+                errors.append(f"{name}: {field} must be a number >= 0")
+
+        models = definition.get("models", {})
+        if not isinstance(models, dict):
+            errors.append(f"{name}: models must be an object of role -> model definition")
+            models = {}
+        for role, model in models.items():
+            if role not in _MODEL_ROLES:
+                errors.append(f"{name}: unknown model role {role}, expected one of {', '.join(_MODEL_ROLES)}")
+            elif not isinstance(model, dict):
+                errors.append(f"{name}: models.{role} must be an object")
+            else:
+                errors.extend(f"{name}: models.{role}.{field} must be a string"
+                              for field in _STRING_FIELDS if field in model and not isinstance(model[field], str))
+
+        prefetch = definition.get("prefetch", {})
+        if prefetch is not False and not isinstance(prefetch, dict):
+            errors.append(f"{name}: prefetch must be false or an object")
+        elif isinstance(prefetch, dict):
+            if not isinstance(prefetch.get("tool", ""), str):
+                errors.append(f"{name}: prefetch.tool must be a string")
+            if not isinstance(prefetch.get("arguments", {}), dict):
+                errors.append(f"{name}: prefetch.arguments must be an object")
+            sources = prefetch.get("sources", {})
+            if not isinstance(sources, dict) or not all(isinstance(url, str) for url in sources.values()):
+                errors.append(f"{name}: prefetch.sources must map source names to URLs")
+
+        servers = definition.get("servers", {})
+        if isinstance(servers, dict):
+            servers = list(servers.values())
+        if not isinstance(servers, list):
+            errors.append(f"{name}: servers must be an object or a list")
+            continue
+        for server in servers:
+            url = server.get("url") if isinstance(server, dict) else None
+            if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+                errors.append(f"{name}: every server needs an http(s) url")
+            elif "/mcp" not in url and "/sse" not in url:
+                errors.append(f"{name}: server url {url} is neither an /mcp nor an /sse endpoint")
+    return errors
+
+
+def definition_hash(definition: dict) -> str:
+    """Stable hash of a single agent definition, used to detect changes."""
+    payload = json.dumps(definition, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def deployment_key(definition: dict) -> str:
+    """The "endpoint|deployment" key of the model backend a (role) definition describes.
+
+    Agents on one key share its rate limiter and concurrency cap. Computed from the
+    definition alone, so the key is known before any agent has been built.
+    """
+    endpoint = definition.get("endpoint")
+    deployment_name = definition.get("deployment_name")
+    if "env_file_path" in definition:
+        # As when building the agent: the process environment wins over the env file, which wins over the definition
+        env = {**dotenv_values(os.path.join(os.path.dirname(os.path.abspath(__file__)), definition["env_file_path"])),
+               **os.environ}
+        endpoint = env.get("AZURE_OPENAI_ENDPOINT") or endpoint
+        deployment_name = env.get("AZURE_OPENAI_MODEL") or deployment_name
+    if "azure" in (endpoint or ""):
+        return f"{endpoint}|{deployment_name}"
+    return f"{endpoint or 'http://localhost:11434'}|{deployment_name or 'gpt-oss:20b'}"
+
+
+class AgentPool:
+    """Warm pool of pre-initialized agents built from one agent definition.
+
+    Each pooled Agent keeps its kernel, chat service, plugin registrations and
+    execution settings; a request checks one out exclusively and gets a fresh thread.
+    """
+
+    def __init__(self, name: str, definition: dict,
+                 size: int = AGENT_POOL_SIZE,
+                 max_size: int = AGENT_POOL_MAX_SIZE,
+                 idle_seconds: float = AGENT_POOL_IDLE_SECONDS):
+        self.name = name
+        self.definition = definition
+        self.hash = definition_hash(definition)
+        self.size = int(definition.get("pool_size", size))
+        self.max_size = max(int(definition.get("pool_max_size", max_size)), self.size, 1)
+        self.idle_seconds = idle_seconds
+        # Model backend of the pooled agents, for the per-deployment cap from the very first request
+        self.deployment = deployment_key(definition.get("models", {}).get("final", definition))
+
+        self._idle: list[tuple["Agent", float]] = []
+        self._total = 0
+        self._in_use = 0
+        self._closed = False
+        self._condition = asyncio.Condition()
+
+    async def _build(self) -> "Agent":
+        # Deferred so that importing the API does not load Semantic Kernel
+        Agent = (await startup.import_in_thread("agent")).Agent
+        # Agent setup mutates the definition (env overrides), so never hand it the shared copy
+        with span("agent_build", self.name):
+            agent = await Agent.create(copy.deepcopy(self.definition))
+        return agent
+
+    async def warm(self) -> int:
+        """Build agents until the pool holds `size` idle instances; returns how many failed to build."""
+        async with self._condition:
+            missing = max(self.size - self._total, 0)
+            self._total += missing
+        if not missing:
+            return 0
+
+        results = await asyncio.gather(*(self._build() for _ in range(missing)), return_exceptions=True)
+        failed = 0
+        async with self._condition:
+            for result in results:
+                if isinstance(result, BaseException):
+                    logging.error(f"Failed to pre-warm agent {self.name}: {result}")
+                    self._total -= 1
+                    failed += 1
+                else:
+                    self._idle.append((result, time.monotonic()))
+            self._condition.notify_all()
+        logging.info(f"Agent pool {self.name} warmed with {len(self._idle)} instance(s)")
+        return failed
+
+    async def _acquire(self) -> "Agent":
+        async with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError(f"Agent pool {self.name} is closed")
+                if self._idle:
+                    # Most recently used first, so surplus instances age out and get evicted
+                    agent, _ = self._idle.pop()
+                    self._in_use += 1
+                    return agent
+                if self._total < self.max_size:
+                    self._total += 1
+                    self._in_use += 1
+                    break
+                await self._condition.wait()
+
+        try:
+            logging.info(f"Agent pool {self.name} exhausted, building a new instance")
+            return await self._build()
+        except BaseException:
+            async with self._condition:
+                self._total -= 1
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+    async def _release(self, agent: "Agent", discard: bool = False):
+        async with self._condition:
+            self._in_use -= 1
+            discard = discard or self._closed
+            if discard:
+                self._total -= 1
+            else:
+                self._idle.append((agent, time.monotonic()))
+            self._condition.notify()
+        if discard:
+            await agent.close()
+
+    @asynccontextmanager
+    async def checkout(self):
+        """Check out an agent with a fresh thread for the duration of a request.
+
+        Usage:
+            async with pool.checkout() as agent:
+                result = await agent.run_agent(query)
+        """
+        with span("checkout", self.name):
+            agent = await self._acquire()
+        failed = False
+        try:
+            agent.reset_thread()
+            yield agent
+        except BaseException:
+            # The agent may have been interrupted mid-run; don't hand it to the next request
+            failed = True
+            raise
+        finally:
+            await self._release(agent, discard=failed)
+
+    async def evict_idle(self):
+        """Drop idle agents beyond `size` that have not been used for `idle_seconds`."""
+        now = time.monotonic()
+        evicted = []
+        async with self._condition:
+            keep = []
+            # Oldest entries are at the front of the idle list
+            for agent, last_used in self._idle:
+                if self._total > self.size and now - last_used > self.idle_seconds:
+                    evicted.append(agent)
+                    self._total -= 1
+                else:
+                    keep.append((agent, last_used))
+            self._idle = keep
+        for agent in evicted:
+            await agent.close()
+        if evicted:
+            logging.info(f"Evicted {len(evicted)} idle agent(s) from pool {self.name}")
+
+    async def close(self):
+        """Close idle agents now; checked-out agents are closed when they are returned."""
+        async with self._condition:
+            self._closed = True
+            idle = [agent for agent, _ in self._idle]
+            self._total -= len(idle)
+            self._idle = []
+            self._condition.notify_all()
+        for agent in idle:
+            await agent.close()
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "max_size": self.max_size,
+            "total": self._total,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "deployment": self.deployment,
+            "definition_hash": self.hash,
+        }
+
+
+class AgentPoolManager:
+    """Owns one AgentPool per agent name and rebuilds them when agent_definition.json changes."""
+
+    def __init__(self, definition_path: str, check_seconds: float = AGENT_POOL_CHECK_SECONDS):
+        self.definition_path = definition_path
+        self.check_seconds = check_seconds
+        self.pools: dict[str, AgentPool] = {}
+        self._mtime = None
+        self._rejected_mtime = None
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._warm_task = None
+        # False until the pools created at start-up have finished warming
+        self.warmed = False
+
+    def _read_definitions(self) -> dict:
+        try:
+            with open(self.definition_path, "r") as f:
+                definitions = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise DefinitionError([f"cannot read {self.definition_path}: {e}"])
+        errors = validate_definitions(definitions)
+        if errors:
+            raise DefinitionError(errors)
+        return definitions
+
+    def names(self) -> list[str]:
+        return list(self.pools.keys())
+
+    def default_name(self) -> str | None:
+        """First agent in the definitions file, used when a request does not name one."""
+        return next(iter(self.pools), None)
+
+    def get(self, name: str | None) -> AgentPool | None:
+        return self.pools.get(name or self.default_name())
+
+    async def start(self):
+        """Create every pool, then start warming, idle eviction and change detection.
+
+        By default the pools warm in the background so the API is ready at once; a request
+        that arrives before its pool is warm builds an agent on demand.
+        """
+        if AGENT_POOL_WARM_ON_START == "blocking":
+            await self.reload(strict=False)
+            self.warmed = True
+        else:
+            await self.reload(strict=False, warm=False)
+            self._warm_task = asyncio.create_task(self._warm_all())
+        self._task = asyncio.create_task(self._maintain())
+
+    async def _warm_all(self):
+        with startup.phase("agent_warm"):
+            await asyncio.gather(*(pool.warm() for pool in list(self.pools.values())))
+        self.warmed = True
+        startup.mark("agents_warm")
+
+    async def reload(self, strict: bool = True, warm: bool = True) -> dict:
+        """Re-read and validate the definitions file, rebuilding only the pools whose definition changed.
+
+        New pools are warmed before they are swapped in. With `strict`, a pool that cannot
+        build any agent aborts the reload and the current pools keep serving. Requests that
+        already checked out an agent from a replaced pool finish on it; the agent is closed
+        when it is returned. With `warm=False` (start-up only) new pools are swapped in cold.
+        """
+        async with self._lock:
+            mtime = os.path.getmtime(self.definition_path)
+            try:
+                definitions = self._read_definitions()
+            except DefinitionError:
+                self._rejected_mtime = mtime
+                raise
+
+            pools = {}
+            retired = []
+            changes = {"added": [], "changed": [], "removed": [], "unchanged": []}
+            for name, definition in definitions.items():
+                pool = self.pools.get(name)
+                if pool is not None and pool.hash == definition_hash(definition):
+                    pools[name] = pool
+                    changes["unchanged"].append(name)
+                    continue
+                pools[name] = AgentPool(name, definition)
+                if pool is not None:
+                    retired.append(pool)
+                    changes["changed"].append(name)
+                else:
+                    changes["added"].append(name)
+            for name, pool in self.pools.items():
+                if name not in definitions:
+                    retired.append(pool)
+                    changes["removed"].append(name)
+
+            # Warm new pools before swapping so requests never see a cold pool
+            new_pools = [pool for name, pool in pools.items() if self.pools.get(name) is not pool]
+            failures = await asyncio.gather(*(pool.warm() for pool in new_pools)) if warm else []
+            broken = [pool.name for pool, failed in zip(new_pools, failures) if pool.size and failed == pool.size]
+            if strict and broken:
+                for pool in new_pools:
+                    await pool.close()
+                self._rejected_mtime = mtime
+                raise DefinitionError([f"{name}: no agent could be built" for name in broken])
+
+            self.pools = pools
+            self._mtime = mtime
+            self._rejected_mtime = None
+
+        for pool in retired:
+            await pool.close()
+        logging.info(f"Agent pools ready: {self.names()} ({len(retired)} retired)")
+        return changes
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(self.check_seconds)
+            try:
+                for pool in list(self.pools.values()):
+                    await pool.evict_idle()
+                mtime = os.path.getmtime(self.definition_path)
+                # A rejected file is not retried until it is edited again
+                if mtime != self._mtime and mtime != self._rejected_mtime:
+                    logging.info(f"{self.definition_path} changed, rebuilding agent pools")
+                    await self.reload()
+            except DefinitionError as e:
+                logging.error(f"Rejected agent definitions, keeping the current pools: {e}")
+            except Exception as e:
+                logging.error(f"Agent pool maintenance failed: {e}")
+
+    async def close(self):
+        for task in (self._warm_task, self._task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._warm_task = None
+        for pool in self.pools.values():
+            await pool.close()
+
+    def stats(self) -> dict:
+        return {name: pool.stats() for name, pool in self.pools.items()}
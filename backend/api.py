@@ -1,18 +1,31 @@
+from startup import startup
 import logging
 from fastapi import FastAPI, APIRouter, status
 from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import RedirectResponse
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv, find_dotenv
 from pathlib import Path
-from fastapi import HTTPException
+from fastapi import HTTPException, Header, Request
 from pydantic import BaseModel
 import json
 import os
-from agent import Agent
-from enum import Enum
+from contextlib import asynccontextmanager, nullcontext
+from agent_pool import AgentPoolManager, DefinitionError
+from mcp_sessions import mcp_sessions
+from result_cache import ResultCache, RESULT_CACHE_TTL
+from sessions import SessionStore
+from jobs import ConcurrencyLimits, JobManager, QueueFullError
+from rate_limiter import rate_limiters
+from http_clients import http_clients
+from tool_cache import ToolResultCache, current_tool_cache
+from batch import BATCH_CONCURRENCY, BATCH_MAX_RUNS, build_runs, merge_results, parse_response
+import asyncio
+from tracing import metrics, request_trace
+from responses import FastJSONResponse, dumps, project
+from typing import Literal
 
 # Configure logging FIRST before any logging calls
 logging.basicConfig(
@@ -26,19 +39,49 @@ API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "8000"))
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 
-logging.info(f"Using {find_dotenv()}. Starting FastAPI app in {ENVIRONMENT} mode")
-
-# Load agent definition
+# Agent definitions are read (and re-read on change) by the pool manager at startup
 current_dir = os.path.dirname(__file__)
-agent_def_path = os.path.join(current_dir, "agent_definition.json")
-with open(agent_def_path, "r") as f:
-    agent_definition = json.load(f)
+agent_def_path = os.getenv("AGENT_DEFINITION_PATH", os.path.join(current_dir, "agent_definition.json"))
+# When set, POST /api/admin/reload requires a matching X-Admin-Token header
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Default deadline for an agent run in seconds (0 = none); "request_timeout_seconds" per agent, X-Request-Timeout per request
+AGENT_REQUEST_TIMEOUT = float(os.getenv("AGENT_REQUEST_TIMEOUT", "0"))
+# Extra time a run stopped at its deadline gets to hand back its partial result
+DEADLINE_GRACE_SECONDS = 2.0
+
+# Pre-initialized agents per agent name, rebuilt when agent_definition.json changes
+agent_pools = AgentPoolManager(agent_def_path)
+
+# Finished agent results keyed by (agent, normalized query, definition hash)
+result_cache = ResultCache()
+
+# Multi-turn conversations: the reduced thread and tool results of each session between turns
+sessions = SessionStore()
+
+# Per-agent / per-deployment caps shared by synchronous requests, streams and jobs
+concurrency_limits = ConcurrencyLimits()
+job_manager = JobManager()
+# Agent runs in flight across every batch request
+batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
 
-agents = list(agent_definition.keys())
-logging.info(f"Loaded agents: {agents}")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Looking for the .env walks up the directory tree, so it happens here rather than at import
+    logging.info(f"Using {find_dotenv()}. Starting FastAPI app in {ENVIRONMENT} mode")
+    with startup.phase("agent_pools_start"):
+        await agent_pools.start()
+    await job_manager.start()
+    startup.mark("ready")
+    yield
+    await job_manager.close()
+    await agent_pools.close()
+    await mcp_sessions.close()
+    await http_clients.close()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+startup.mark("api_imported")
 
 
 # Add CORS middleware with environment-based configuration
@@ -60,50 +103,414 @@ router = APIRouter(prefix="/api")
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "message": "Backend is running"}
+    return {"status": "healthy", "message": "Backend is running", "agents_warm": agent_pools.warmed}
+
+@router.get("/startup")
+async def get_startup():
+    """Start-up timeline and the first-import cost of the lazily loaded Semantic Kernel modules"""
+    return startup.to_dict()
+
+# ?view= on agent endpoints, see responses.RESPONSE_VIEWS
+ResponseView = Literal["final", "summary", "full"]
 
 class QueryRequest(BaseModel):
     query: str = "what are the recent documents about AI on bbc.com?"
+    # From POST /api/sessions; the query is then a follow-up in that conversation
+    session_id: str | None = None
 
-# Create enum from agents list
-AgentName = Enum('AgentName', {agent: agent for agent in agents})
+class BatchRequest(BaseModel):
+    query: str = ""
+    queries: list[str] = []
+    sources: list[str] = []
+    topics: list[str] = []
 
 @router.get("/agents", response_model=list[str])
 async def get_agents():
     """Get list of available agents"""
-    return agents
+    return agent_pools.names()
 
-@router.post("/agent")
-async def agent_endpoint(request: QueryRequest, agent_name: str = agents[0]):
+@router.post("/admin/reload")
+async def reload_agents(x_admin_token: str | None = Header(None)):
+    """Re-read agent_definition.json now and swap in the agents whose definition changed.
 
-    if agent_name not in agent_definition:
+    Invalid definitions are rejected with 422 and the current agents keep serving.
+    """
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    try:
+        return await agent_pools.reload()
+    except DefinitionError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+
+def _get_pool(agent_name: str | None):
+    """Pool for the named agent, or for the first defined agent when no name is given."""
+    pool = agent_pools.get(agent_name)
+    if pool is None:
         raise HTTPException(status_code=404, detail="Agent not found")
+    return pool
+
+@router.post("/sessions", status_code=status.HTTP_201_CREATED)
+async def create_session(agent_name: str | None = None):
+    """Start a conversation; pass its session_id with /agent or /agent_stream queries to ask follow-ups.
+
+    Sessions expire after SESSION_TTL seconds without a turn.
+    """
+    pool = _get_pool(agent_name)
+    return sessions.create(pool.name).to_dict()
+
+@router.get("/sessions")
+async def get_sessions():
+    """Live session count and how many were created, expired or evicted"""
+    return sessions.stats()
+
+def _get_session(session_id: str):
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return session
+
+@router.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Turns, history length and tool results of a session"""
+    return _get_session(session_id).to_dict()
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """End a session and drop its history and tool results"""
+    session = sessions.delete(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return session.to_dict()
 
-    logging.info(f"Creating agent: {agent_name}")
-    logging.debug(f"Agent config: {agent_definition[agent_name]}")
-    # Create agent
-    agent = await Agent.create(agent_definition[agent_name])
+def _session_pool(request: QueryRequest, agent_name: str | None):
+    """Session of the request (if any) and the pool to run it on; a session stays with its agent."""
+    session = _get_session(request.session_id) if request.session_id else None
+    pool = _get_pool(agent_name or (session.agent_name if session else None))
+    if session is not None and session.agent_name != pool.name:
+        raise HTTPException(status_code=409, detail=f"Session belongs to agent {session.agent_name}")
+    return session, pool
 
-    logging.info(f"Agent created: {agent_name}")
+@router.get("/mcp/sessions")
+async def get_mcp_sessions():
+    """Connection and call statistics for the pooled MCP sessions"""
+    return mcp_sessions.stats()
+
+def _is_cacheable(result) -> bool:
+    return isinstance(result, dict) and "error" not in result and "status_code" not in result and not result.get("partial") and not result.get("truncated")
+
+def _limits(pool):
+    return concurrency_limits.hold(pool.name, pool.deployment, pool.definition.get("max_concurrent_runs"))
+
+def _deadline(pool, request_timeout: float | None = None) -> float | None:
+    """Event-loop time a run must finish by: the tighter of X-Request-Timeout and the agent's request_timeout_seconds."""
+    timeouts = [timeout for timeout in (request_timeout, pool.definition.get("request_timeout_seconds", AGENT_REQUEST_TIMEOUT)) if timeout]
+    return asyncio.get_running_loop().time() + min(timeouts) if timeouts else None
+
+async def _run(pool, query: str, session=None, deadline: float | None = None):
+    """Check out an agent under the shared concurrency limits and run the query, giving up at `deadline`."""
+    logging.info(f"Checking out agent: {pool.name}")
+    logging.debug(f"Agent config: {pool.definition}")
+    guard = asyncio.timeout_at(deadline + DEADLINE_GRACE_SECONDS if deadline is not None else None)
     try:
-        result = await agent.run_agent(request.query)
-        logging.debug("Received response from agent: %s", result)
-        
-        # Check if the result contains a status_code indicating an error
-        if isinstance(result, dict) and "status_code" in result:
-            status_code = result["status_code"]
-            if status_code == 429:
-                raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
-            elif status_code >= 400:
-                raise HTTPException(status_code=status_code, detail=result.get("response", {}).get("error", "An error occurred"))
-        
-        return result
-    except HTTPException:
-        # Re-raise HTTPExceptions (including the ones we just created above)
+        async with guard, _limits(pool), pool.checkout() as agent:
+            return await agent.run_agent(query, session=session, deadline=deadline)
+    except TimeoutError:
+        if not guard.expired():
+            raise
+        # Still waiting for a concurrency slot or an agent; the run itself stops at the deadline
+        return {"status_code": 504, "response": {"error": "Request deadline exceeded"}}
+
+async def _unless_disconnected(http_request: Request, awaitable):
+    """Await `awaitable`, cancelling it if the client disconnects first.
+
+    Cancelling a cached run only stops it once no other request is waiting for it.
+    """
+    task = asyncio.ensure_future(awaitable)
+
+    async def disconnected():
+        # The body has been read, so the next message is the disconnect
+        while (await http_request.receive())["type"] != "http.disconnect":
+            pass
+
+    watcher = asyncio.create_task(disconnected())
+    try:
+        done, _ = await asyncio.wait([task, watcher], return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
         raise
-    except Exception as e:
-        logging.error(f"Error running agent {agent_name}: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        watcher.cancel()
+    if task not in done:
+        task.cancel()
+        metrics.inc("friday_requests_cancelled_total", reason="disconnect", partial="false")
+        logging.info(f"Client disconnected from {http_request.url.path}, cancelled its run")
+        # 499 as in nginx: nobody is left to read it
+        raise HTTPException(status_code=499, detail="Client disconnected")
+    return task.result()
+
+async def _run_cached(pool, query: str, bypass: bool = False, deadline: float | None = None):
+    """Run an agent through the result cache and the shared concurrency limits.
+
+    Coalesced requests share the first request's deadline; partial results are not cached.
+    """
+    async def run():
+        return await _run(pool, query, deadline=deadline)
+
+    return await result_cache.get_or_run(
+        result_cache.key(pool.name, query, pool.hash),
+        run,
+        ttl=float(pool.definition.get("cache_ttl_seconds", RESULT_CACHE_TTL)),
+        cacheable=_is_cacheable,
+        bypass=bypass,
+    )
+
+async def _run_session(pool, session, query: str, deadline: float | None = None):
+    """Run the next turn of a session; turns of one session never overlap and are never cached."""
+    async with session.lock:
+        return await _run(pool, query, session=session, deadline=deadline)
+
+def _raise_for_result(result):
+    """Map an agent error result to the matching HTTP error."""
+    if isinstance(result, dict) and "status_code" in result:
+        status_code = result["status_code"]
+        if status_code == 429:
+            raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
+        elif status_code >= 400:
+            raise HTTPException(status_code=status_code, detail=result.get("response", {}).get("error", "An error occurred"))
+
+@router.get("/rate_limits")
+async def get_rate_limits():
+    """Admission, throttling and concurrency statistics per model deployment"""
+    return rate_limiters.stats()
+
+@router.get("/http_clients")
+async def get_http_clients():
+    """Pooled connections of the shared model endpoint clients"""
+    return http_clients.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Request, span and token metrics plus pool, queue and connection gauges in Prometheus text format"""
+    gauges = []
+    for name, stats in agent_pools.stats().items():
+        gauges.append(("friday_agent_pool_in_use", "Pooled agents checked out", {"agent": name}, stats["in_use"]))
+        gauges.append(("friday_agent_pool_idle", "Pooled agents idle", {"agent": name}, stats["idle"]))
+    for name, stats in mcp_sessions.stats().items():
+        gauges.append(("friday_mcp_connected", "Whether the MCP session is connected", {"server": name}, int(stats["connected"])))
+        gauges.append(("friday_mcp_in_flight", "MCP tool calls in flight", {"server": name}, stats["in_flight"]))
+    for name, stats in rate_limiters.stats().items():
+        gauges.append(("friday_llm_concurrency", "Concurrent model calls allowed by the rate limiter", {"deployment": name}, stats["concurrency"]))
+        gauges.append(("friday_llm_throttled", "429 responses seen by the rate limiter", {"deployment": name}, stats["throttled"]))
+    job_stats = job_manager.stats()
+    gauges.append(("friday_jobs_queued", "Jobs waiting for a worker", {}, job_stats["queued"]))
+    cache_stats = result_cache.stats()
+    for outcome in ("hits", "misses", "coalesced", "abandoned"):
+        gauges.append(("friday_result_cache", "Result cache lookups by outcome", {"outcome": outcome}, cache_stats[outcome]))
+    gauges.append(("friday_sessions", "Live multi-turn sessions", {}, sessions.stats()["sessions"]))
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
+@router.post("/agent")
+async def agent_endpoint(request: QueryRequest, http_request: Request, agent_name: str | None = None,
+                         timings: bool = False,
+                         view: ResponseView | None = None,
+                         cache_control: str | None = Header(None),
+                         x_cache_bypass: str | None = Header(None),
+                         x_request_timeout: float | None = Header(None, gt=0)):
+    """Run an agent; identical queries within the agent's cache_ttl_seconds are served from cache.
+
+    Send `Cache-Control: no-cache` or `X-Cache-Bypass: 1` to force a fresh run, and
+    `?timings=true` to get the request's trace spans in a `timings` field. `?view=` picks
+    `final` (answer only), `summary` (plus tool-call metadata) or `full` (plus chat history).
+    With a `session_id` the query continues that session and skips the cache.
+
+    The run is cancelled if the client disconnects. `X-Request-Timeout` (seconds) or the
+    agent's request_timeout_seconds sets a deadline; a run that reaches it returns what it
+    gathered so far with `"partial": true`, or 504 if it gathered nothing.
+    """
+    session, pool = _session_pool(request, agent_name)
+    agent_name = pool.name
+    deadline = _deadline(pool, x_request_timeout)
+
+    bypass = bool(x_cache_bypass and x_cache_bypass != "0") or "no-cache" in (cache_control or "").lower()
+
+    with request_trace("agent", agent_name) as trace:
+        try:
+            if session is not None:
+                result = await _unless_disconnected(http_request, _run_session(pool, session, request.query, deadline))
+                cache_status = "BYPASS"
+            else:
+                result, cache_status = await _unless_disconnected(
+                    http_request, _run_cached(pool, request.query, bypass=bypass, deadline=deadline))
+            logging.debug("Received response from agent: %s", result)
+            
+            # Check if the result contains a status_code indicating an error
+            _raise_for_result(result)
+            
+            # Projection copies the result, so the cached one is never modified
+            result = project(result, view)
+            if session is not None:
+                result = {**result, "session_id": session.id}
+            if timings:
+                result = {**result, "timings": trace.to_dict()}
+            return FastJSONResponse(result, headers={"X-Cache": cache_status})
+        except HTTPException:
+            # Re-raise HTTPExceptions (including the ones we just created above)
+            raise
+        except Exception as e:
+            logging.error(f"Error running agent {agent_name}: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event; pings become comments so proxies keep the connection open."""
+    if event == "ping":
+        return ": ping\n\n"
+    return f"event: {event}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+@router.post("/agent_stream")
+async def agent_stream_endpoint(request: QueryRequest, agent_name: str | None = None, timings: bool = False,
+                                view: ResponseView | None = None,
+                                x_request_timeout: float | None = Header(None, gt=0)):
+    """Run an agent and stream tool calls, tool results, tokens and the final JSON as server-sent events.
+
+    The stream, and with it the run, stops when the client disconnects. Deadlines work as for /agent.
+    """
+    session, pool = _session_pool(request, agent_name)
+    agent_name = pool.name
+    deadline = _deadline(pool, x_request_timeout)
+
+    async def event_stream():
+        with request_trace("agent_stream", agent_name) as trace:
+            async with session.lock if session is not None else nullcontext():
+                async with _limits(pool), pool.checkout() as agent:
+                    async for event, data in agent.stream_agent(request.query, session=session, deadline=deadline):
+                        if event == "final":
+                            data = project(data, view)
+                            if session is not None:
+                                data = {**data, "session_id": session.id}
+                            if timings:
+                                data = {**data, "timings": trace.to_dict()}
+                        yield _sse(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/agent_batch")
+async def agent_batch_endpoint(request: BatchRequest, http_request: Request, agent_name: str | None = None,
+                               timings: bool = False,
+                               x_request_timeout: float | None = Header(None, gt=0)):
+    """Run a list of queries, or one query per source x topic, as concurrent agent runs.
+
+    Runs share one tool-result cache, so a page fetched by one run is reused by the
+    others, and their per-URL results are merged and deduplicated into one response.
+    A deadline applies to the batch as a whole; a disconnect cancels all of its runs.
+    """
+    pool = _get_pool(agent_name)
+    agent_name = pool.name
+    deadline = _deadline(pool, x_request_timeout)
+
+    runs = build_runs(request.query, request.queries, request.sources, request.topics)
+    if not runs:
+        raise HTTPException(status_code=400, detail="Provide a query, queries, or sources/topics")
+    if len(runs) > BATCH_MAX_RUNS:
+        raise HTTPException(status_code=400, detail=f"Batch expands to {len(runs)} runs, the limit is {BATCH_MAX_RUNS}")
+
+    async def run_one(run: dict):
+        async with batch_semaphore:
+            try:
+                result, run["cache"] = await _run_cached(pool, run["query"], deadline=deadline)
+            except Exception as e:
+                logging.error(f"Batch run for agent {agent_name} failed: {e}")
+                result = {"error": str(e)}
+        response = parse_response(result)
+        run["status"] = "ok" if response is not None else "failed"
+        run["results"] = len(response or {})
+        if response is None and isinstance(result, dict):
+            run["error"] = result.get("error") or result.get("response")
+        return response
+
+    tool_cache = ToolResultCache()
+    token = current_tool_cache.set(tool_cache)
+    try:
+        with request_trace("agent_batch", agent_name) as trace:
+            responses = await _unless_disconnected(http_request, asyncio.gather(*(run_one(run) for run in runs)))
+    finally:
+        current_tool_cache.reset(token)
+
+    merged = merge_results(responses)
+    logging.info(f"Batch of {len(runs)} runs for agent {agent_name} merged into {len(merged)} results ({tool_cache.stats()})")
+    result = {
+        "response": json.dumps(merged),
+        "runs": runs,
+        "tool_cache": tool_cache.stats(),
+    }
+    if timings:
+        result["timings"] = trace.to_dict()
+    return result
+
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(request: QueryRequest, agent_name: str | None = None):
+    """Queue an agent run and return its job id immediately; poll /api/jobs/{job_id} for the outcome.
+
+    Answers 503 with Retry-After when the queue is full.
+    """
+    pool = _get_pool(agent_name)
+    agent_name = pool.name
+
+    async def run():
+        with request_trace("job", agent_name):
+            # Only the agent's own deadline applies, counted from when the job starts
+            result, _ = await _run_cached(pool, request.query, deadline=_deadline(pool))
+        return result
+
+    try:
+        job = job_manager.submit(agent_name, request.query, run)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    return job.to_dict()
+
+@router.get("/jobs")
+async def get_jobs():
+    """Queue depth, job counts and free concurrency slots"""
+    return {**job_manager.stats(), "limits": concurrency_limits.stats()}
+
+def _get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a queued job"""
+    return _get_job(job_id).to_dict()
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, view: ResponseView | None = None):
+    """Result of a finished job; 202 with the status while it is still queued or running"""
+    job = _get_job(job_id)
+    if not job.done:
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=job.to_dict())
+    if job.status == "cancelled":
+        raise HTTPException(status_code=409, detail="Job was cancelled")
+    _raise_for_result(job.result)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error or "Job failed")
+    return FastJSONResponse(project(job.result, view))
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 
 
@@ -0,0 +1,92 @@
+import time
+
+from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+from semantic_kernel.exceptions import ServiceResponseException
+
+from history_reducer import CHARS_PER_TOKEN
+from rate_limiter import (
+    RATE_LIMIT_BACKOFF_INITIAL,
+    RATE_LIMIT_BACKOFF_MAX,
+    RATE_LIMIT_COMPLETION_TOKENS,
+    RATE_LIMIT_MAX_WAIT,
+    rate_limiters,
+)
+from tracing import metrics, span
+
+
+def _rate_limit_headers(e: Exception):
+    """Headers of the HTTP 429 behind a service exception, or None if it was not a 429."""
+    cause = e.__cause__ or e
+    if getattr(cause, "status_code", None) != 429:
+        return None
+    response = getattr(cause, "response", None)
+    return getattr(response, "headers", None) or {}
+
+
+class RateLimitedAzureChatCompletion(AzureChatCompletion):
+    """AzureChatCompletion that admits requests through the deployment's RateLimiter.
+
+    The OpenAI client's own retries are disabled so that 429s reach the limiter,
+    which waits them out (within RATE_LIMIT_MAX_WAIT) instead of failing the run.
+    """
+
+    rate_limit_key: str | None = None
+
+    def model_post_init(self, __context):
+        super().model_post_init(__context)
+        self.client = self.client.with_options(max_retries=0)
+
+    @staticmethod
+    def _estimate_tokens(settings) -> float:
+        """Tokens charged at admission: the prompt and a modest completion, not the whole max_tokens."""
+        chars = sum(len(str(message.get("content") or "")) for message in (settings.messages or []))
+        return chars / CHARS_PER_TOKEN + min(settings.max_tokens or RATE_LIMIT_COMPLETION_TOKENS, RATE_LIMIT_COMPLETION_TOKENS)
+
+    def _record_usage(self, usage):
+        metrics.inc("friday_llm_tokens_total", usage.prompt_tokens, deployment=self.ai_model_id, type="prompt")
+        metrics.inc("friday_llm_tokens_total", usage.completion_tokens, deployment=self.ai_model_id, type="completion")
+
+    async def _inner_get_streaming_chat_message_contents(self, chat_history, settings, function_invoke_attempt: int = 0):
+        """Stream as usual, settling the admission estimate once the last chunk reports the usage."""
+        settings = self.get_prompt_execution_settings_from_settings(settings)
+        async for messages in super()._inner_get_streaming_chat_message_contents(chat_history, settings, function_invoke_attempt):
+            usage = getattr(messages[0].inner_content, "usage", None) if messages else None
+            if usage is not None:
+                self._record_usage(usage)
+                if self.rate_limit_key is not None:
+                    rate_limiters.get(self.rate_limit_key).settle(self._estimate_tokens(settings), usage.total_tokens)
+            yield messages
+
+    async def _send_request(self, settings):
+        if self.rate_limit_key is None:
+            return await super()._send_request(settings)
+
+        limiter = rate_limiters.get(self.rate_limit_key)
+        estimated = self._estimate_tokens(settings)
+        deadline = time.monotonic() + RATE_LIMIT_MAX_WAIT
+        backoff = RATE_LIMIT_BACKOFF_INITIAL
+        while True:
+            async with limiter.slot(estimated, deadline) as waited:
+                with span("llm", self.ai_model_id, stream=bool(settings.stream), waited_ms=round(waited * 1000, 1)) as attributes:
+                    try:
+                        response = await super()._send_request(settings)
+                    except ServiceResponseException as e:
+                        headers = _rate_limit_headers(e)
+                        if headers is None:
+                            raise
+                        attributes["throttled"] = True
+                        wait = limiter.on_throttled(headers, backoff)
+                        if time.monotonic() + wait > deadline:
+                            limiter.gave_up += 1
+                            raise
+                        limiter.retries += 1
+                        backoff = min(backoff * 2, RATE_LIMIT_BACKOFF_MAX)
+                        continue
+                    # Streaming responses only report usage at the end of the stream; see _inner_get_streaming_chat_message_contents
+                    usage = getattr(response, "usage", None)
+                    if usage is not None:
+                        attributes["prompt_tokens"] = usage.prompt_tokens
+                        attributes["completion_tokens"] = usage.completion_tokens
+                        self._record_usage(usage)
+            limiter.on_success(estimated, getattr(usage, "total_tokens", None))
+            return response
@@ -0,0 +1,101 @@
+import json
+import os
+from urllib.parse import urlsplit, urlunsplit
+
+# Agent runs in flight across all batches, and the most runs one batch may ask for
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_RUNS = int(os.getenv("BATCH_MAX_RUNS", "50"))
+
+
+def build_runs(query: str = "", queries: list[str] | None = None,
+               sources: list[str] | None = None, topics: list[str] | None = None) -> list[dict]:
+    """Expand explicit queries and the sources x topics matrix into one prompt per agent run."""
+    runs = [{"query": q} for q in (queries or []) if q.strip()]
+
+    sources = sources or [None]
+    topics = topics or [None]
+    if sources != [None] or topics != [None]:
+        for source in sources:
+            for topic in topics:
+                prompt = f"Answer the user's query: {query}."
+                if source:
+                    prompt += f" They would like to focus on articles from: {source}."
+                if topic:
+                    prompt += f" Only include articles related to the following topic: {topic}. Do not include things not related to this topic."
+                runs.append({"query": prompt, "source": source, "topic": topic})
+    elif query.strip() and not runs:
+        runs.append({"query": query})
+    return runs
+
+
+def normalize_url(url: str) -> str:
+    """Key used to spot the same article reported by several runs."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower().removeprefix("www."), path, parts.query, ""))
+
+
+def _merge_item(existing: dict, item: dict):
+    for field, value in item.items():
+        current = existing.get(field)
+        if isinstance(current, list) and isinstance(value, list):
+            seen = {json.dumps(v, sort_keys=True, default=str) for v in current}
+            for v in value:
+                marker = json.dumps(v, sort_keys=True, default=str)
+                if marker not in seen:
+                    seen.add(marker)
+                    current.append(v)
+        elif not current and value:
+            existing[field] = value
+
+
+def parse_response(result) -> dict | None:
+    """The per-URL result dict of one agent run, or None if the run failed or returned prose."""
+    if not isinstance(result, dict) or "error" in result or "status_code" in result:
+        return None
+    response = result.get("response")
+    if isinstance(response, str):
+        try:
+            response = json.loads(response)
+        except json.JSONDecodeError:
+            return None
+    return response if isinstance(response, dict) else None
+
+
+def results_from_tools(tools_called: list[dict]) -> dict:
+    """Per-URL results built straight from the articles a run extracted, for runs stopped before the model answered."""
+    results = {}
+    for tool in tools_called:
+        try:
+            article = json.loads(tool.get("results") or "")
+        except (TypeError, json.JSONDecodeError):
+            continue
+        if not isinstance(article, dict) or not article.get("url") or article.get("error"):
+            continue
+        if not (article.get("text") or article.get("excerpt")):
+            continue
+        results[article["url"]] = {
+            "title": article.get("title") or "",
+            "summary": article.get("excerpt") or "",
+            "content": article.get("text") or "",
+            "media": [],
+            "images": [image["src"] for image in article.get("images") or [] if isinstance(image, dict) and image.get("src")],
+        }
+    return results
+
+
+def merge_results(responses: list[dict | None]) -> dict:
+    """Merge per-URL results, combining entries that point at the same article."""
+    merged: dict[str, dict] = {}
+    urls: dict[str, str] = {}
+    for response in responses:
+        for url, item in (response or {}).items():
+            if not isinstance(item, dict):
+                continue
+            key = normalize_url(url)
+            if key not in urls:
+                urls[key] = url
+                merged[url] = json.loads(json.dumps(item, default=str))
+            else:
+                _merge_item(merged[urls[key]], item)
+    return merged
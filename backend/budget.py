@@ -0,0 +1,80 @@
+import asyncio
+import os
+import time
+
+from history_reducer import estimate_tokens
+
+# Allowance of one agent run's tool loop, overridable per agent with "budget_seconds" / "budget_tokens" (0 = unlimited)
+AGENT_BUDGET_SECONDS = float(os.getenv("AGENT_BUDGET_SECONDS", "0"))
+AGENT_BUDGET_TOKENS = int(os.getenv("AGENT_BUDGET_TOKENS", "0"))
+# Share of either budget after which the model gets one last turn, without tools, to answer
+AGENT_BUDGET_FINISH_AT = float(os.getenv("AGENT_BUDGET_FINISH_AT", "0.8"))
+
+FINISH_INSTRUCTION = (
+    "The time and token budget for this request is nearly used up. Do not call any more tools. "
+    "Answer now in the requested format, using only the information gathered so far."
+)
+
+
+class RunBudget:
+    """Time and token allowance of one agent run, checked before each step of the tool loop.
+
+    Past `finish_at` of either allowance the run is `low` and should wrap up; once
+    either is spent it is `exhausted` and no further model or tool calls are made.
+    A deadline on the request caps the time allowance.
+    """
+
+    def __init__(self, seconds: float | None = None, tokens: int | None = None,
+                 deadline: float | None = None, finish_at: float = AGENT_BUDGET_FINISH_AT):
+        if deadline is not None:
+            remaining = deadline - asyncio.get_running_loop().time()
+            seconds = min(seconds, remaining) if seconds else remaining
+        self.seconds = seconds or None
+        self.tokens = tokens or None
+        self.finish_at = finish_at
+        self.started = time.monotonic()
+        self.used_tokens = 0
+        # Set once the tool loop was cut short because of the budget
+        self.stopped = False
+        self._counted: set[int] = set()
+
+    @property
+    def limited(self) -> bool:
+        return self.seconds is not None or self.tokens is not None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def spend(self, message, history=()):
+        """Count a model turn once: its reported usage, or an estimate from the prompt history and the reply."""
+        if id(message) in self._counted:
+            return
+        self._counted.add(id(message))
+        usage = message.metadata.get("usage")
+        if usage is not None and usage.prompt_tokens is not None:
+            self.used_tokens += usage.prompt_tokens + (usage.completion_tokens or 0)
+        else:
+            self.used_tokens += sum(estimate_tokens(m) for m in history) + estimate_tokens(message)
+
+    def _used(self) -> float:
+        """Largest share of either allowance used so far."""
+        shares = [0.0]
+        if self.seconds is not None:
+            shares.append(self.elapsed() / self.seconds if self.seconds > 0 else 1.0)
+        if self.tokens is not None:
+            shares.append(self.used_tokens / self.tokens)
+        return max(shares)
+
+    def low(self) -> bool:
+        return self._used() >= self.finish_at
+
+    def exhausted(self) -> bool:
+        return self._used() >= 1
+
+    def to_dict(self) -> dict:
+        return {
+            "seconds": round(self.elapsed(), 3),
+            "tokens": self.used_tokens,
+            "budget_seconds": self.seconds,
+            "budget_tokens": self.tokens,
+        }
@@ -0,0 +1,93 @@
+import logging
+
+from pydantic import Field
+
+from semantic_kernel.contents import ChatHistorySummarizationReducer, FunctionCallContent, FunctionResultContent
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+
+from tracing import span
+
+# Rough characters-per-token ratio for English text and JSON; good enough for budgeting
+CHARS_PER_TOKEN = 4
+# Per-message framing the chat APIs add on top of the content
+MESSAGE_OVERHEAD_TOKENS = 4
+ELIDED_METADATA_KEY = "__elided__"
+
+
+def _text_of(result) -> str:
+    if isinstance(result, list):
+        return "".join(getattr(item, "text", None) or str(item) for item in result)
+    return "" if result is None else str(result)
+
+
+def estimate_tokens(message: ChatMessageContent) -> int:
+    """Cheap local token estimate for a message, including tool calls and results."""
+    chars = 0
+    for item in message.items:
+        if isinstance(item, FunctionResultContent):
+            chars += len(_text_of(item.result))
+        elif isinstance(item, FunctionCallContent):
+            chars += len(item.name or "") + len(str(item.arguments or ""))
+        else:
+            chars += len(getattr(item, "text", None) or "")
+    return chars // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+class TokenBudgetReducer(ChatHistorySummarizationReducer):
+    """Summarization reducer driven by an estimated token budget instead of message counts.
+
+    `reduce()` is free while the history fits in `max_tokens`. Over budget, older
+    oversized tool results are elided locally first (the newest
+    `keep_recent_tool_results` stay verbatim); the model is only asked to summarize
+    if the history still does not fit after that.
+    """
+
+    max_tokens: int = Field(default=8000, gt=0, description="Token budget for the whole history.")
+    keep_recent_tool_results: int = Field(default=2, ge=0, description="Newest tool results never elided.")
+    max_tool_result_tokens: int = Field(default=1000, gt=0, description="Older tool results are cut to this size.")
+
+    def total_tokens(self) -> int:
+        return sum(estimate_tokens(message) for message in self.messages)
+
+    def _elide_tool_results(self) -> int:
+        """Truncate older tool results that exceed `max_tool_result_tokens`; returns how many were cut."""
+        results = [
+            item for message in self.messages for item in message.items
+            if isinstance(item, FunctionResultContent)
+        ]
+        older = results[:-self.keep_recent_tool_results] if self.keep_recent_tool_results else results
+
+        keep_chars = self.max_tool_result_tokens * CHARS_PER_TOKEN
+        elided = 0
+        for item in older:
+            if item.metadata.get(ELIDED_METADATA_KEY):
+                continue
+            text = _text_of(item.result)
+            if len(text) <= keep_chars:
+                continue
+            item.result = f"{text[:keep_chars]}\n[... {len(text) - keep_chars} characters elided to save context ...]"
+            item.metadata[ELIDED_METADATA_KEY] = True
+            elided += 1
+        return elided
+
+    async def reduce(self):
+        tokens = self.total_tokens()
+        if tokens <= self.max_tokens:
+            return None
+
+        with span("reduce", "history", tokens_before=tokens) as attributes:
+            elided = self._elide_tool_results()
+            attributes["elided"] = elided
+            if elided:
+                after = self.total_tokens()
+                logging.info(f"Elided {elided} tool result(s): ~{tokens} -> ~{after} tokens (budget {self.max_tokens})")
+                tokens = after
+                if tokens <= self.max_tokens:
+                    attributes["tokens_after"] = tokens
+                    return self
+
+            logging.info(f"History still ~{tokens} tokens after elision (budget {self.max_tokens}), summarizing")
+            attributes["summarized"] = True
+            summarized = await super().reduce()
+            attributes["tokens_after"] = self.total_tokens()
+            return summarized or (self if elided else None)
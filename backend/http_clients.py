@@ -0,0 +1,95 @@
+import importlib.util
+import logging
+import os
+from urllib.parse import urlsplit
+
+import httpx
+
+# Connection pool tuning for model endpoints, shared by every agent in the process
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "120"))
+LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "10"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "600"))
+# "auto" turns HTTP/2 on when the h2 package is installed; "1"/"0" force it
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "auto").lower()
+
+
+def http2_enabled() -> bool:
+    if LLM_HTTP2 == "auto":
+        return importlib.util.find_spec("h2") is not None
+    return LLM_HTTP2 in ("1", "true", "yes")
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class HttpClientRegistry:
+    """One keep-alive httpx.AsyncClient per model endpoint origin (scheme, host and port).
+
+    Chat services built for any agent reuse the same pooled connections, so only
+    the first request to an endpoint pays for the TCP and TLS handshakes.
+    """
+
+    def __init__(self):
+        self.clients: dict[str, httpx.AsyncClient] = {}
+        self.ollama_clients: dict[str, object] = {}
+
+    def _client_options(self) -> dict:
+        return {
+            "http2": http2_enabled(),
+            "limits": httpx.Limits(
+                max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+            ),
+            "timeout": httpx.Timeout(LLM_HTTP_TIMEOUT, connect=LLM_HTTP_CONNECT_TIMEOUT),
+        }
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        """Shared client for the endpoint serving `url`; the OpenAI SDK sets base URL and headers per request."""
+        origin = _origin(url)
+        client = self.clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(follow_redirects=True, **self._client_options())
+            self.clients[origin] = client
+            logging.info(f"Created shared HTTP client for {origin} (http2={http2_enabled()})")
+        return client
+
+    def get_ollama(self, host: str):
+        """Shared ollama.AsyncClient for an Ollama host; it owns its own pooled httpx client."""
+        from ollama import AsyncClient
+
+        origin = _origin(host)
+        client = self.ollama_clients.get(origin)
+        if client is None:
+            client = AsyncClient(host=host, **self._client_options())
+            self.ollama_clients[origin] = client
+            logging.info(f"Created shared Ollama client for {origin}")
+        return client
+
+    async def close(self):
+        clients = list(self.clients.values()) + [client._client for client in self.ollama_clients.values()]
+        self.clients = {}
+        self.ollama_clients = {}
+        for client in clients:
+            await client.aclose()
+
+    @staticmethod
+    def _pool_stats(client: httpx.AsyncClient) -> dict:
+        # httpcore does not expose pool counters publicly; these are best effort
+        connections = getattr(getattr(client._transport, "_pool", None), "connections", [])
+        return {
+            "connections": len(connections),
+            "idle": sum(1 for connection in connections if connection.is_idle()),
+        }
+
+    def stats(self) -> dict:
+        stats = {origin: self._pool_stats(client) for origin, client in self.clients.items()}
+        stats.update({origin: self._pool_stats(client._client) for origin, client in self.ollama_clients.items()})
+        return stats
+
+
+http_clients = HttpClientRegistry()
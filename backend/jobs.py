@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import math
+import os
+import time
+import uuid
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, Awaitable, Callable
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_AGENT_CONCURRENCY = int(os.getenv("JOB_AGENT_CONCURRENCY", "4"))
+JOB_DEPLOYMENT_CONCURRENCY = int(os.getenv("JOB_DEPLOYMENT_CONCURRENCY", "8"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimits:
+    """Shared per-agent and per-deployment caps on concurrent agent runs."""
+
+    def __init__(self, agent_concurrency: int = JOB_AGENT_CONCURRENCY,
+                 deployment_concurrency: int = JOB_DEPLOYMENT_CONCURRENCY):
+        self.agent_concurrency = agent_concurrency
+        self.deployment_concurrency = deployment_concurrency
+        self._agents: dict[str, asyncio.Semaphore] = {}
+        self._agent_limits: dict[str, int] = {}
+        self._deployments: dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def hold(self, agent_name: str, deployment: str | None = None, agent_concurrency: int | None = None):
+        """Hold a slot for the agent and, when known, for the deployment it calls."""
+        async with AsyncExitStack() as stack:
+            limit = agent_concurrency or self.agent_concurrency
+            # A reloaded definition may change the cap; runs holding the old semaphore release it as usual
+            if self._agent_limits.get(agent_name) != limit:
+                self._agents[agent_name] = asyncio.Semaphore(limit)
+                self._agent_limits[agent_name] = limit
+            await stack.enter_async_context(self._agents[agent_name])
+            if deployment:
+                if deployment not in self._deployments:
+                    self._deployments[deployment] = asyncio.Semaphore(self.deployment_concurrency)
+                await stack.enter_async_context(self._deployments[deployment])
+            yield
+
+    def stats(self) -> dict:
+        return {
+            "agents": {name: sem._value for name, sem in self._agents.items()},
+            "deployments": {name: sem._value for name, sem in self._deployments.items()},
+        }
+
+
+class Job:
+    """One queued agent run and its outcome."""
+
+    def __init__(self, agent_name: str, query: str, run: Callable[[], Awaitable[Any]]):
+        self.id = uuid.uuid4().hex
+        self.agent_name = agent_name
+        self.query = query
+        self.run = run
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.task: asyncio.Task | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "agent_name": self.agent_name,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """Bounded queue of agent runs drained by a fixed pool of asyncio workers.
+
+    Per-agent and per-deployment caps are applied by the run callables themselves
+    (see ConcurrencyLimits), so jobs and synchronous requests share them.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE,
+                 result_ttl: float = JOB_RESULT_TTL):
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=queue_size)
+        self.jobs: dict[str, Job] = {}
+        self._workers: list[asyncio.Task] = []
+        # Moving average of run time, used to suggest a Retry-After when the queue is full
+        self._avg_run_seconds = 30.0
+
+    async def start(self):
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        for job in self.jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.queue.qsize() / max(self.workers, 1) * self._avg_run_seconds))
+
+    def submit(self, agent_name: str, query: str, run: Callable[[], Awaitable[Any]]) -> Job:
+        """Queue a run, raising QueueFullError instead of letting the backlog grow unbounded."""
+        self._purge()
+        job = Job(agent_name, query, run)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(self.retry_after())
+        self.jobs[job.id] = job
+        logging.info(f"Queued job {job.id} for agent {agent_name} ({self.queue.qsize()} queued)")
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Job | None:
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return job
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            # Still queued; the worker that picks it up will skip it
+            self._finish(job, "cancelled")
+        return job
+
+    def _finish(self, job: Job, status: str, result: Any = None, error: str | None = None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+
+    def _purge(self):
+        cutoff = time.time() - self.result_ttl
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.done and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.done:
+                    continue
+                job.status = "running"
+                job.started_at = time.time()
+                job.task = asyncio.create_task(job.run())
+                try:
+                    result = await job.task
+                except asyncio.CancelledError:
+                    if asyncio.current_task().cancelling():
+                        raise  # the worker itself is shutting down
+                    self._finish(job, "cancelled")
+                    continue
+                except Exception as e:
+                    logging.error(f"Job {job.id} failed: {e}")
+                    self._finish(job, "failed", error=str(e))
+                    continue
+
+                if isinstance(result, dict) and ("error" in result or "status_code" in result):
+                    self._finish(job, "failed", result=result, error=str(result.get("error") or result.get("response")))
+                else:
+                    self._finish(job, "succeeded", result=result)
+                self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * (job.finished_at - job.started_at)
+            finally:
+                job.task = None
+                self.queue.task_done()
+
+    def stats(self) -> dict:
+        counts: dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "jobs": counts,
+            "avg_run_seconds": round(self._avg_run_seconds, 2),
+        }
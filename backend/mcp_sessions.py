@@ -0,0 +1,274 @@
+import asyncio
+import functools
+import logging
+import os
+import random
+import time
+from contextlib import AsyncExitStack
+
+from startup import startup
+from tracing import span
+
+MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "10"))
+MCP_PING_INTERVAL = float(os.getenv("MCP_PING_INTERVAL", "30"))
+MCP_PING_TIMEOUT = float(os.getenv("MCP_PING_TIMEOUT", "5"))
+MCP_REQUEST_TIMEOUT = int(os.getenv("MCP_REQUEST_TIMEOUT", "300"))
+MCP_BACKOFF_INITIAL = float(os.getenv("MCP_BACKOFF_INITIAL", "0.5"))
+MCP_BACKOFF_MAX = float(os.getenv("MCP_BACKOFF_MAX", "30"))
+
+
+class _PooledPluginMixin:
+    """Routes tool calls through the owning MCPSession so they can wait out reconnects."""
+
+    pooled_session: "MCPSession | None" = None
+
+    async def call_tool(self, tool_name: str, **kwargs):
+        if self.pooled_session is None:
+            return await super().call_tool(tool_name, **kwargs)
+        return await self.pooled_session.call_tool(super().call_tool, tool_name, **kwargs)
+
+
+@functools.cache
+def _plugin_classes():
+    """Pooled MCP plugin classes, created on first use so importing this module stays cheap."""
+    mcp = startup.timed_import("semantic_kernel.connectors.mcp")
+
+    class PooledStreamableHttpPlugin(_PooledPluginMixin, mcp.MCPStreamableHttpPlugin):
+        pass
+
+    class PooledSsePlugin(_PooledPluginMixin, mcp.MCPSsePlugin):
+        pass
+
+    return PooledStreamableHttpPlugin, PooledSsePlugin
+
+
+class MCPSession:
+    """A long-lived connection to one MCP server, shared by every agent that uses it.
+
+    A supervisor task owns the connection: it connects, pings the server every
+    `ping_interval` seconds and reconnects with exponential backoff when the
+    server stops answering. The MCP client session multiplexes concurrent
+    requests, so agents running in parallel share it without extra handshakes.
+    """
+
+    def __init__(self, name: str, url: str, max_concurrency: int | None = None,
+                 connect_timeout: float = MCP_CONNECT_TIMEOUT,
+                 ping_interval: float = MCP_PING_INTERVAL,
+                 ping_timeout: float = MCP_PING_TIMEOUT):
+        self.name = name
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+
+        PooledStreamableHttpPlugin, PooledSsePlugin = _plugin_classes()
+        if "/mcp" in url:
+            self.plugin = PooledStreamableHttpPlugin(name=name, url=url, request_timeout=MCP_REQUEST_TIMEOUT)
+        elif "/sse" in url:
+            self.plugin = PooledSsePlugin(name=name, url=url, request_timeout=MCP_REQUEST_TIMEOUT)
+        else:
+            raise ValueError(f"Unknown MCP transport for server {name}: {url}")
+        self.plugin.pooled_session = self
+
+        # Process-wide cap on concurrent tool calls to this server ("max_concurrency" in the server config)
+        self._limit = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.max_concurrency = max_concurrency
+
+        self._ready = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._task = None
+
+        self.connects = 0
+        self.failures = 0
+        self.calls = 0
+        self.call_errors = 0
+        self.in_flight = 0
+        self.cancelled = 0
+        # Cancellation notices still being sent; referenced so they are not garbage collected
+        self._cancels: set[asyncio.Task] = set()
+        self.last_ping_ms = None
+        self.last_error = None
+        self.connected_since = None
+
+    @property
+    def connected(self) -> bool:
+        return self._ready.is_set()
+
+    async def start(self):
+        """Start the supervisor and wait (bounded) for the first connection."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._supervise())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f"MCP server {self.name} at {self.url} is not reachable: {self.last_error}")
+
+    async def _connect(self):
+        started = time.perf_counter()
+        try:
+            with span("mcp_connect", self.name):
+                await asyncio.wait_for(self.plugin.connect(), timeout=self.connect_timeout)
+        except BaseException:
+            await self._disconnect()
+            raise
+        self.connects += 1
+        self.connected_since = time.time()
+        self._ready.set()
+        logging.info(f"Connected to MCP server {self.name} in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    async def _disconnect(self):
+        self._ready.clear()
+        self.connected_since = None
+        task = self.plugin._current_task
+        try:
+            if self.plugin.session is not None:
+                await asyncio.wait_for(self.plugin.close(), timeout=self.ping_timeout)
+            elif task is not None and not task.done():
+                # A connect that never finished; SK leaves it waiting forever
+                task.cancel()
+                await asyncio.wait([task], timeout=self.ping_timeout)
+        except BaseException as e:
+            logging.debug(f"Error while closing MCP server {self.name}: {e}")
+        # Start the next attempt from a clean slate regardless of how the last one ended
+        self.plugin._current_task = None
+        self.plugin._exit_stack = AsyncExitStack()
+        self.plugin.session = None
+
+    async def _ping(self):
+        started = time.perf_counter()
+        await asyncio.wait_for(self.plugin.session.send_ping(), timeout=self.ping_timeout)
+        self.last_ping_ms = (time.perf_counter() - started) * 1000
+
+    async def _supervise(self):
+        backoff = MCP_BACKOFF_INITIAL
+        try:
+            while True:
+                try:
+                    if not self.connected:
+                        await self._connect()
+                        backoff = MCP_BACKOFF_INITIAL
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=self.ping_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wake.clear()
+                    # Calls in flight already prove liveness, and a busy server may be slow to
+                    # answer a ping; tearing the session down then would kill those calls
+                    if self.in_flight == 0:
+                        await self._ping()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.failures += 1
+                    self.last_error = str(e) or type(e).__name__
+                    logging.warning(f"MCP server {self.name} unavailable ({self.last_error}), retrying in {backoff:.1f}s")
+                    await self._disconnect()
+                    await asyncio.sleep(backoff * random.uniform(0.8, 1.2))
+                    backoff = min(backoff * 2, MCP_BACKOFF_MAX)
+        finally:
+            await self._disconnect()
+
+    async def call_tool(self, call, tool_name: str, **kwargs):
+        """Run a tool call on the shared session, waiting briefly if a reconnect is underway."""
+        if not self.connected:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=self.connect_timeout)
+            except asyncio.TimeoutError:
+                raise ConnectionError(f"MCP server {self.name} is not connected: {self.last_error}")
+
+        self.calls += 1
+        self.in_flight += 1
+        try:
+            if self._limit is None:
+                return await self._call(call, tool_name, **kwargs)
+            async with self._limit:
+                return await self._call(call, tool_name, **kwargs)
+        except Exception:
+            self.call_errors += 1
+            # Have the supervisor check the connection now rather than at the next ping;
+            # a restarted server reports "Session terminated" as an ordinary McpError
+            self._wake.set()
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def _call(self, call, tool_name: str, **kwargs):
+        # The call reaches send_request without suspending, so it takes the session's next request id
+        session = self.plugin.session
+        request_id = session._request_id if session is not None else None
+        try:
+            return await call(tool_name, **kwargs)
+        except asyncio.CancelledError:
+            # The client only stops waiting; tell the server so it stops working on the call too
+            if request_id is not None and session is self.plugin.session:
+                self.cancelled += 1
+                task = asyncio.create_task(self._cancel_remote(session, request_id))
+                self._cancels.add(task)
+                task.add_done_callback(self._cancels.discard)
+            raise
+
+    async def _cancel_remote(self, session, request_id: int):
+        from mcp import types
+
+        notification = types.CancelledNotification(
+            params=types.CancelledNotificationParams(requestId=request_id, reason="Cancelled by the client"),
+        )
+        try:
+            await asyncio.wait_for(session.send_notification(types.ClientNotification(notification)), timeout=self.ping_timeout)
+        except Exception as e:
+            logging.debug(f"Could not cancel request {request_id} on MCP server {self.name}: {e}")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "connected": self.connected,
+            "connected_since": self.connected_since,
+            "connects": self.connects,
+            "failures": self.failures,
+            "calls": self.calls,
+            "call_errors": self.call_errors,
+            "in_flight": self.in_flight,
+            "cancelled": self.cancelled,
+            "max_concurrency": self.max_concurrency,
+            "last_ping_ms": self.last_ping_ms,
+            "last_error": self.last_error,
+        }
+
+
+class MCPSessionManager:
+    """Process-wide registry of MCP sessions keyed by (server name, url)."""
+
+    def __init__(self):
+        self.sessions: dict[tuple[str, str], MCPSession] = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, name: str, url: str, max_concurrency: int | None = None):
+        """Return a connected, shareable plugin for the server, starting a session if needed."""
+        async with self._lock:
+            session = self.sessions.get((name, url))
+            if session is None:
+                session = MCPSession(name, url, max_concurrency)
+                self.sessions[(name, url)] = session
+        await session.start()
+        return session.plugin
+
+    async def close(self):
+        sessions = list(self.sessions.values())
+        self.sessions = {}
+        await asyncio.gather(*(session.close() for session in sessions), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {f"{name} ({url})": session.stats() for (name, url), session in self.sessions.items()}
+
+
+# Shared by every Agent in the process
+mcp_sessions = MCPSessionManager()
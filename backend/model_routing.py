@@ -0,0 +1,81 @@
+from typing import Any, AsyncGenerator, ClassVar
+
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
+from semantic_kernel.contents import ChatMessageContent, FunctionCallContent, StreamingChatMessageContent
+
+from tracing import metrics
+
+
+class TieredChatCompletion(ChatCompletionClientBase):
+    """Routes each turn of the tool-calling loop to the triage model and the answer to the final model.
+
+    Semantic Kernel's auto function invocation calls `_inner_get_chat_message_contents`
+    once per turn. The triage model gets every turn first. While it picks tools, its
+    turn is used as is; once it stops calling tools the final model takes the same
+    history and either answers or calls more tools itself. Execution settings are
+    the final model's and are converted for the triage model on each turn.
+    """
+
+    SUPPORTS_FUNCTION_CALLING: ClassVar[bool] = True
+
+    final: ChatCompletionClientBase
+    triage: ChatCompletionClientBase
+
+    def __init__(self, final: ChatCompletionClientBase, triage: ChatCompletionClientBase):
+        super().__init__(
+            ai_model_id=f"{triage.ai_model_id}>{final.ai_model_id}",
+            service_id=final.service_id,
+            final=final,
+            triage=triage,
+        )
+
+    def get_prompt_execution_settings_class(self):
+        return self.final.get_prompt_execution_settings_class()
+
+    def _update_function_choice_settings_callback(self):
+        return self.final._update_function_choice_settings_callback()
+
+    def _reset_function_choice_settings(self, settings):
+        self.final._reset_function_choice_settings(settings)
+
+    def _count(self, role: str, service: ChatCompletionClientBase):
+        metrics.inc("friday_model_turns_total", role=role, model=service.ai_model_id)
+
+    async def _triage_turn(self, chat_history, settings) -> ChatMessageContent | None:
+        """The triage model's turn if it called tools; None when the turn belongs to the final model."""
+        # Turns without tools on offer (e.g. after the auto-invoke limit) are always the final model's
+        if settings.function_choice_behavior is None or not getattr(settings, "tools", None):
+            return None
+        triage_settings = self.triage.get_prompt_execution_settings_from_settings(settings)
+        completions = await self.triage._inner_get_chat_message_contents(chat_history, triage_settings)
+        self._count("triage", self.triage)
+        if any(isinstance(item, FunctionCallContent) for item in completions[0].items):
+            return completions[0]
+        return None
+
+    async def _inner_get_chat_message_contents(self, chat_history, settings) -> list[ChatMessageContent]:
+        message = await self._triage_turn(chat_history, settings)
+        if message is not None:
+            return [message]
+        self._count("final", self.final)
+        return await self.final._inner_get_chat_message_contents(chat_history, settings)
+
+    async def _inner_get_streaming_chat_message_contents(
+        self, chat_history, settings, function_invoke_attempt: int = 0,
+    ) -> AsyncGenerator[list[StreamingChatMessageContent], Any]:
+        # Tool-calling turns carry no text worth streaming, so the triage turn is fetched whole
+        message = await self._triage_turn(chat_history, settings)
+        if message is not None:
+            yield [StreamingChatMessageContent(
+                role=message.role,
+                choice_index=0,
+                items=message.items,
+                ai_model_id=message.ai_model_id,
+                function_invoke_attempt=function_invoke_attempt,
+            )]
+            return
+        self._count("final", self.final)
+        async for messages in self.final._inner_get_streaming_chat_message_contents(
+            chat_history, settings, function_invoke_attempt
+        ):
+            yield messages
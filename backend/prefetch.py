@@ -0,0 +1,44 @@
+import os
+import re
+
+from batch import normalize_url
+
+# Speculative fetching of the pages a query names, started while the first model turn is in flight.
+# Overridable per agent with "prefetch": {"tool": ..., "arguments": {...}, "sources": {...}} or "prefetch": false.
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1").lower() in ("1", "true", "yes")
+PREFETCH_TOOL = os.getenv("PREFETCH_TOOL", "list_links_with_descriptions_tool")
+PREFETCH_MAX_SEEDS = int(os.getenv("PREFETCH_MAX_SEEDS", "3"))
+
+# Front pages of the sources users pick by name (the Streamlit "locations")
+SOURCE_SEEDS = {
+    "the guardian": "https://www.theguardian.com",
+    "npr": "https://www.npr.org",
+    "fox news": "https://www.foxnews.com",
+    "bbc": "https://www.bbc.com/news",
+    "reuters": "https://www.reuters.com",
+    "associated press": "https://apnews.com",
+}
+
+_URL = re.compile(r"https?://[^\s\"'<>),]+", re.IGNORECASE)
+# Bare domains such as bbc.com or www.npr.org; two-letter minimum TLD keeps "e.g." out
+_DOMAIN = re.compile(r"(?<![\w@/.-])((?:[a-z0-9-]+\.)+[a-z]{2,})(?![\w/-])", re.IGNORECASE)
+
+
+def seed_urls(query: str, sources: dict[str, str] | None = None, limit: int = PREFETCH_MAX_SEEDS) -> list[str]:
+    """URLs the model is likely to fetch first: explicit URLs, bare domains and named sources, in that order."""
+    candidates = [url.rstrip(".") for url in _URL.findall(query)]
+    without_urls = _URL.sub(" ", query)
+    candidates += [f"https://{domain.rstrip('.')}" for domain in _DOMAIN.findall(without_urls)]
+    # Names only count in prose, so "bbc" in bbc.co.uk does not add the BBC front page as well
+    lowered = _DOMAIN.sub(" ", without_urls).lower()
+    for name, url in (sources if sources is not None else SOURCE_SEEDS).items():
+        if re.search(rf"\b{re.escape(name.lower())}\b", lowered):
+            candidates.append(url)
+
+    seeds, seen = [], set()
+    for url in candidates:
+        key = normalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            seeds.append(url)
+    return seeds[:limit]
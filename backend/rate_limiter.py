@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import time
+from contextlib import asynccontextmanager
+
+# Defaults per deployment; 0 disables that bucket until a 429 reports the real limit.
+# Overridable per agent with "rate_limit_rpm" / "rate_limit_tpm" / "max_concurrent_requests".
+RATE_LIMIT_RPM = float(os.getenv("RATE_LIMIT_RPM", "0"))
+RATE_LIMIT_TPM = float(os.getenv("RATE_LIMIT_TPM", "0"))
+RATE_LIMIT_MAX_CONCURRENCY = int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", "16"))
+# How long one model call may spend waiting for capacity and retrying 429s
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "60"))
+RATE_LIMIT_BACKOFF_INITIAL = float(os.getenv("RATE_LIMIT_BACKOFF_INITIAL", "1"))
+RATE_LIMIT_BACKOFF_MAX = float(os.getenv("RATE_LIMIT_BACKOFF_MAX", "30"))
+# Completion tokens charged when a call is admitted (at most its max_tokens); settled from the reported usage
+RATE_LIMIT_COMPLETION_TOKENS = int(os.getenv("RATE_LIMIT_COMPLETION_TOKENS", "1000"))
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a request cannot be admitted before its deadline."""
+
+
+class TokenBucket:
+    """Continuously refilled bucket holding up to one minute of capacity."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if it is available now)."""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        # A single request larger than the bucket is admitted once the bucket is full
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) * 60 / self.capacity)
+
+    def take(self, amount: float):
+        if self.enabled:
+            self._refill()
+            self.tokens -= amount
+
+    def set_capacity(self, per_minute: float):
+        if per_minute > 0 and per_minute != self.capacity:
+            self._refill()
+            self.tokens = min(self.tokens, per_minute) if self.enabled else per_minute
+            self.capacity = per_minute
+
+
+def _parse_duration(value: str) -> float | None:
+    """Parse durations like '20', '1.5s', '250ms' or '6m0s' into seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"([\d.]+)\s*(ms|s|m|h)", value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def retry_after_from_headers(headers) -> float | None:
+    """Longest wait the server asked for across the Retry-After and x-ratelimit-reset-* headers."""
+    if not headers:
+        return None
+    waits = []
+    if headers.get("retry-after-ms"):
+        try:
+            waits.append(float(headers["retry-after-ms"]) / 1000)
+        except ValueError:
+            pass
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        if headers.get(name):
+            seconds = _parse_duration(headers[name])
+            if seconds is not None:
+                waits.append(seconds)
+    return max(waits) if waits else None
+
+
+class RateLimiter:
+    """Token-bucket (RPM and TPM) and AIMD concurrency limiter for one model deployment.
+
+    Every admitted request takes one request token and its estimated tokens. A 429
+    halves the allowed concurrency and pauses the whole deployment for as long as
+    the server asked; each success grows the concurrency back by roughly one per
+    window of successful calls.
+    """
+
+    def __init__(self, key: str, rpm: float = RATE_LIMIT_RPM, tpm: float = RATE_LIMIT_TPM,
+                 max_concurrency: int = RATE_LIMIT_MAX_CONCURRENCY):
+        self.key = key
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+        self.admitted = 0
+        self.throttled = 0
+        self.retries = 0
+        self.gave_up = 0
+        self.waited_seconds = 0.0
+
+    def _admission_wait(self, estimated_tokens: float) -> float | None:
+        """Seconds to wait before admitting; None means wait for a concurrency slot."""
+        if self.in_flight >= max(1, int(self.concurrency)):
+            return None
+        return max(self.blocked_until - time.monotonic(),
+                   self.requests.wait_time(1),
+                   self.tokens.wait_time(estimated_tokens))
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: float, deadline: float):
+        """Hold one admitted request for the deployment, waiting for capacity until `deadline`.
+
+        Yields the seconds spent waiting for admission.
+        """
+        started = time.monotonic()
+        async with self._condition:
+            while True:
+                wait = self._admission_wait(estimated_tokens)
+                if wait is not None and wait <= 0:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (wait is not None and wait > remaining):
+                    self.gave_up += 1
+                    raise RateLimitTimeout(f"Deployment {self.key} is rate limited, no capacity before the deadline")
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout=min(wait or remaining, remaining))
+                except asyncio.TimeoutError:
+                    pass
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+            self.in_flight += 1
+            self.admitted += 1
+        waited = time.monotonic() - started
+        self.waited_seconds += waited
+        try:
+            yield waited
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self, estimated_tokens: float, used_tokens: int | None = None):
+        # Additive increase: about +1 slot after a full window of successes
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1 / max(self.concurrency, 1))
+        if used_tokens is not None:
+            self.settle(estimated_tokens, used_tokens)
+
+    def settle(self, estimated_tokens: float, used_tokens: int):
+        """Correct the tokens taken at admission to what the call really used."""
+        self.tokens.take(used_tokens - estimated_tokens)
+
+    def on_throttled(self, headers, backoff: float) -> float:
+        """Record a 429 and return how long this caller should wait before retrying."""
+        self.throttled += 1
+        now = time.monotonic()
+        retry_after = retry_after_from_headers(headers)
+        wait = retry_after if retry_after is not None else backoff
+        # Jitter so the callers released together don't all retry on the same tick
+        wait *= random.uniform(1.0, 1.25)
+        self.blocked_until = max(self.blocked_until, now + wait)
+
+        # Multiplicative decrease, once per throttling episode rather than per failed call
+        if now - self._last_decrease > wait:
+            self.concurrency = max(1.0, self.concurrency / 2)
+            self._last_decrease = now
+            logging.warning(f"Deployment {self.key} throttled, concurrency now {int(self.concurrency)}, pausing {wait:.1f}s")
+
+        if headers:
+            # The 429 tells us the real limits when they were not configured
+            for bucket, name in ((self.requests, "x-ratelimit-limit-requests"), (self.tokens, "x-ratelimit-limit-tokens")):
+                try:
+                    limit = float(headers.get(name) or 0)
+                except ValueError:
+                    continue
+                if limit and not bucket.enabled:
+                    bucket.set_capacity(limit)
+        return wait
+
+    def stats(self) -> dict:
+        return {
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "concurrency": int(self.concurrency),
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+            "admitted": self.admitted,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "gave_up": self.gave_up,
+            "waited_seconds": round(self.waited_seconds, 2),
+        }
+
+
+class RateLimiterRegistry:
+    """Process-wide rate limiters keyed by deployment, shared by every agent that calls it."""
+
+    def __init__(self):
+        self.limiters: dict[str, RateLimiter] = {}
+
+    def get(self, key: str, rpm: float | None = None, tpm: float | None = None,
+            max_concurrency: int | None = None) -> RateLimiter:
+        limiter = self.limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(
+                key,
+                rpm=RATE_LIMIT_RPM if rpm is None else rpm,
+                tpm=RATE_LIMIT_TPM if tpm is None else tpm,
+                max_concurrency=max_concurrency or RATE_LIMIT_MAX_CONCURRENCY,
+            )
+            self.limiters[key] = limiter
+        return limiter
+
+    def stats(self) -> dict:
+        return {key: limiter.stats() for key, limiter in self.limiters.items()}
+
+
+rate_limiters = RateLimiterRegistry()
@@ -0,0 +1,53 @@
+import json
+import os
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used without it
+    orjson = None
+
+# How much of an agent result goes back to the client, overridable per request with ?view=
+#   final:   the answer only
+#   summary: the answer plus tool names, arguments and result sizes
+#   full:    also the whole chat history and every raw tool result
+RESPONSE_VIEWS = ("final", "summary", "full")
+RESPONSE_VIEW = os.getenv("RESPONSE_VIEW", "summary")
+
+# Result fields that carry the run's transcript; everything else passes through every view
+_TRANSCRIPT_FIELDS = ("chat_history", "tools_called")
+
+
+def dumps(data) -> bytes:
+    """Compact JSON encoding, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with `dumps`, skipping FastAPI's jsonable_encoder pass over large results."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def project(result, view: str | None = None):
+    """Return the part of an agent result the requested view includes."""
+    view = view or RESPONSE_VIEW
+    if view == "full" or not isinstance(result, dict) or "chat_history" not in result:
+        return result
+
+    projected = {key: value for key, value in result.items() if key not in _TRANSCRIPT_FIELDS}
+    if view == "summary":
+        projected["tools_called"] = [
+            {
+                "name": tool.get("name"),
+                "arguments": tool.get("arguments"),
+                "result_chars": len(tool.get("results") or ""),
+            }
+            for tool in result.get("tools_called", [])
+        ]
+        projected["message_count"] = len(result["chat_history"])
+    return projected
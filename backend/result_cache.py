@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "600"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256"))
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace and case so trivially different queries share an entry."""
+    return " ".join(query.split()).casefold()
+
+
+class ResultCache:
+    """LRU cache of agent results with per-entry TTL and in-flight request coalescing.
+
+    Concurrent requests for the same key share one agent run; only successful
+    results are stored. A run is cancelled once every request waiting for it has
+    gone away (client disconnected, job cancelled).
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    @staticmethod
+    def key(agent_name: str, query: str, definition_hash: str) -> str:
+        raw = "\0".join((agent_name, normalize_query(query), definition_hash))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any, ttl: float):
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_run(self, key: str, run: Callable[[], Awaitable[Any]], ttl: float,
+                         cacheable: Callable[[Any], bool] = lambda value: True,
+                         bypass: bool = False) -> tuple[Any, str]:
+        """Return (value, status) where status is HIT, MISS, COALESCED or BYPASS.
+
+        A bypass skips the lookup and coalescing but still refreshes the entry.
+        """
+        if not bypass:
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                return value, "HIT"
+            task = self._inflight.get(key)
+            if task is not None:
+                self.coalesced += 1
+                return await self._wait(task), "COALESCED"
+
+        self.misses += 1
+
+        async def run_and_store():
+            try:
+                value = await run()
+                if cacheable(value):
+                    self.put(key, value, ttl)
+                return value
+            finally:
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+
+        task = asyncio.ensure_future(run_and_store())
+        if not bypass:
+            self._inflight[key] = task
+        value = await self._wait(task)
+        return value, "BYPASS" if bypass else "MISS"
+
+    async def _wait(self, task: asyncio.Task):
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # Shielded so one caller going away doesn't cancel the run for the others
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                # Only possible when the last caller was cancelled; nobody is left to read the result
+                if not task.done():
+                    self.abandoned += 1
+                    task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+        }
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+from tool_cache import ToolResultCache
+
+# Multi-turn sessions: idle lifetime, how many are kept at once, and tool results remembered per session
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "256"))
+SESSION_MAX_TOOL_RESULTS = int(os.getenv("SESSION_MAX_TOOL_RESULTS", "64"))
+
+
+class Session:
+    """Conversation state carried between the turns of one client's session.
+
+    `messages` is the agent thread as it stood after the last turn, already reduced
+    to the agent's history budget. `tool_cache` holds the tool results gathered so
+    far, so a follow-up that needs the same page is answered without fetching it again;
+    calls that failed are not kept there, so a follow-up retries them.
+    """
+
+    def __init__(self, agent_name: str, max_tool_results: int = SESSION_MAX_TOOL_RESULTS):
+        self.id = uuid.uuid4().hex
+        self.agent_name = agent_name
+        self.messages: list = []
+        self.tool_cache = ToolResultCache(max_entries=max_tool_results)
+        # Turns of one session run one at a time, each starting from the previous one's thread
+        self.lock = asyncio.Lock()
+        self.turns = 0
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+
+    def save(self, messages):
+        """Keep the thread of a finished turn; the pooled agent's own thread is cleared afterwards."""
+        self.messages = list(messages)
+        self.turns += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.id,
+            "agent_name": self.agent_name,
+            "turns": self.turns,
+            "messages": len(self.messages),
+            "tool_cache": self.tool_cache.stats(),
+            "created_at": self.created_at,
+            "idle_seconds": round(time.monotonic() - self.last_used, 3),
+        }
+
+
+class SessionStore:
+    """LRU of sessions, each expiring `ttl` seconds after its last use."""
+
+    def __init__(self, max_sessions: int = SESSION_MAX, ttl: float = SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _purge(self):
+        cutoff = time.monotonic() - self.ttl
+        # Least recently used first, so stop at the first session that is still live
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used >= cutoff:
+                break
+            del self._sessions[session.id]
+            self.expired += 1
+
+    def create(self, agent_name: str) -> Session:
+        self._purge()
+        session = Session(agent_name)
+        self._sessions[session.id] = session
+        self.created += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+        return session
+
+    def get(self, session_id: str) -> Session | None:
+        """The live session with this id, marked as just used; None if unknown or expired."""
+        self._purge()
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> Session | None:
+        return self._sessions.pop(session_id, None)
+
+    def stats(self) -> dict:
+        self._purge()
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl": self.ttl,
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
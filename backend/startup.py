@@ -0,0 +1,59 @@
+import asyncio
+import importlib
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+# Imported first by api.py, so this is as close to process start as the app can see
+STARTED = time.perf_counter()
+
+
+class StartupReport:
+    """Where start-up time goes: app phases plus the heavy modules imported on first use.
+
+    Semantic Kernel and its provider connectors are only imported when an agent that
+    needs them is built, so they show up here under "imports" with their first-import cost.
+    """
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self.imports: dict[str, float] = {}
+
+    def mark(self, phase: str):
+        """Record how long after start-up `phase` was reached."""
+        self.phases[phase] = round(time.perf_counter() - STARTED, 3)
+        logging.info(f"Startup: {phase} after {self.phases[phase]:.3f}s")
+
+    def timed_import(self, module: str):
+        """Import `module`, recording the cost the first time it is loaded.
+
+        Always goes through importlib: a module another thread is still executing is
+        already in sys.modules, and only the import lock makes us wait for it to finish.
+        """
+        first = module not in sys.modules
+        started = time.perf_counter()
+        loaded = importlib.import_module(module)
+        if first and module not in self.imports:
+            self.imports[module] = round(time.perf_counter() - started, 3)
+            logging.info(f"Startup: imported {module} in {self.imports[module]:.3f}s")
+        return loaded
+
+    async def import_in_thread(self, module: str):
+        """`timed_import` in a worker thread, so a slow first import does not stall the event loop."""
+        return await asyncio.to_thread(self.timed_import, module)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Record the duration of a start-up step under `<name>_seconds`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[f"{name}_seconds"] = round(time.perf_counter() - started, 3)
+
+    def to_dict(self) -> dict:
+        return {"phases": self.phases, "imports": self.imports}
+
+
+startup = StartupReport()
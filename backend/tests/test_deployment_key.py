@@ -0,0 +1,38 @@
+"""Per-deployment key of a pool, known before its first agent is built (agent_pool.deployment_key)."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import Agent  # noqa: E402
+from agent_pool import AgentPool  # noqa: E402
+
+AZURE = {
+    "name": "Test",
+    "service_id": "Test",
+    "endpoint": "https://test.openai.azure.com",
+    "api_key": "test",
+    "api_version": "2024-10-21",
+    "deployment_name": "test",
+    "prefetch": False,
+}
+
+
+def test_cold_pool_knows_the_azure_deployment():
+    pool = AgentPool("Test", AZURE)
+    assert pool.deployment == "https://test.openai.azure.com|test"
+    assert pool.deployment == Agent(dict(AZURE)).deployment
+
+
+def test_cold_pool_knows_the_ollama_default():
+    pool = AgentPool("Local", {"name": "Local"})
+    assert pool.deployment == "http://localhost:11434|gpt-oss:20b"
+
+
+def test_final_model_sets_the_deployment():
+    final = {"service_id": "Test", "endpoint": "https://final.openai.azure.com", "api_key": "test",
+             "api_version": "2024-10-21", "deployment_name": "big"}
+    definition = {**AZURE, "models": {"final": final}}
+    pool = AgentPool("Test", definition)
+    assert pool.deployment == "https://final.openai.azure.com|big"
+    assert pool.deployment == Agent(dict(definition)).deployment
@@ -0,0 +1,58 @@
+"""Concurrent first imports through StartupReport (startup.import_in_thread)."""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_pool import AgentPool  # noqa: E402
+from startup import StartupReport  # noqa: E402
+
+SLOW_MODULE = """
+import time
+time.sleep(0.2)
+VALUE = 1
+"""
+
+
+def test_concurrent_callers_get_the_initialized_module(tmp_path, monkeypatch):
+    (tmp_path / "slow_startup_module.py").write_text(SLOW_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    report = StartupReport()
+
+    async def value():
+        # Read as soon as the import returns: a partially initialized module has no VALUE yet
+        return (await report.import_in_thread("slow_startup_module")).VALUE
+
+    async def load():
+        first = asyncio.create_task(value())
+        # The others arrive while the first is still executing the module
+        await asyncio.sleep(0.05)
+        return await asyncio.gather(first, *(value() for _ in range(3)))
+
+    assert asyncio.run(load()) == [1, 1, 1, 1]
+    assert list(report.imports) == ["slow_startup_module"]
+    sys.modules.pop("slow_startup_module", None)
+
+
+def test_pool_of_two_warms_with_a_cold_agent_import(monkeypatch):
+    # The agent module is imported by the pool's first builds, as right after start-up
+    monkeypatch.delitem(sys.modules, "agent", raising=False)
+    pool = AgentPool("Test", {
+        "name": "Test",
+        "service_id": "Test",
+        "endpoint": "https://test.openai.azure.com",
+        "api_key": "test",
+        "api_version": "2024-10-21",
+        "deployment_name": "test",
+        "prefetch": False,
+        "pool_size": 2,
+    })
+
+    async def warm():
+        try:
+            return await pool.warm()
+        finally:
+            await pool.close()
+
+    assert asyncio.run(warm()) == 0
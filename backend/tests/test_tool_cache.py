@@ -0,0 +1,110 @@
+"""Failed tool calls are not kept in shared tool-result caches (Agent._invoke_tool)."""
+import asyncio
+import json
+import os
+import sys
+
+from semantic_kernel.contents import ChatHistory, ChatMessageContent, FunctionCallContent, FunctionResultContent
+from semantic_kernel.contents.utils.author_role import AuthorRole
+from semantic_kernel.functions import kernel_function
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import Agent  # noqa: E402
+from sessions import Session  # noqa: E402
+from tool_cache import ToolResultCache, current_tool_cache  # noqa: E402
+
+DEFINITION = {
+    "name": "Test",
+    "service_id": "Test",
+    "endpoint": "https://test.openai.azure.com",
+    "api_key": "test",
+    "api_version": "2024-10-21",
+    "deployment_name": "test",
+    "prefetch": False,
+}
+
+
+class FlakyTools:
+    """Fails its first `failures` calls, by raising or by answering with an error object."""
+
+    def __init__(self, failures: int = 1, raises: bool = True):
+        self.failures = failures
+        self.raises = raises
+        self.calls = 0
+
+    @kernel_function(name="fetch")
+    async def fetch(self, url: str) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            if self.raises:
+                raise ConnectionError("site unreachable")
+            return json.dumps({"url": url, "error": "Error extracting article: timed out"})
+        return f"page {url}"
+
+
+def make_agent(tools: FlakyTools) -> Agent:
+    agent = Agent(DEFINITION)
+    agent.kernel.add_plugin(tools, "web")
+    return agent
+
+
+async def call_tool(agent: Agent) -> str:
+    """One model turn calling web-fetch, run the way SK's auto-invoke loop does; returns the tool result."""
+    call = FunctionCallContent(id="call_0", name="web-fetch", arguments='{"url": "http://x/1"}')
+    history = ChatHistory()
+    history.add_message(ChatMessageContent(role=AuthorRole.ASSISTANT, items=[call]))
+    await agent.kernel.invoke_function_call(function_call=call, chat_history=history, function_call_count=1)
+    return next(str(item.result) for message in history.messages for item in message.items
+                if isinstance(item, FunctionResultContent))
+
+
+def test_batch_retries_a_call_that_raised():
+    tools = FlakyTools()
+    cache = ToolResultCache()
+
+    async def batch():
+        token = current_tool_cache.set(cache)
+        try:
+            return [await call_tool(make_agent(tools)) for _ in range(3)]
+        finally:
+            current_tool_cache.reset(token)
+
+    first, second, third = asyncio.run(batch())
+    assert "site unreachable" in first
+    assert second == third == "page http://x/1"
+    # The failure was not served to the second run; the success was served to the third
+    assert tools.calls == 2
+    assert cache.stats()["entries"] == 1
+
+
+def test_batch_retries_a_call_answered_with_an_error():
+    tools = FlakyTools(raises=False)
+    cache = ToolResultCache()
+
+    async def batch():
+        token = current_tool_cache.set(cache)
+        try:
+            return [await call_tool(make_agent(tools)) for _ in range(2)]
+        finally:
+            current_tool_cache.reset(token)
+
+    first, second = asyncio.run(batch())
+    assert "timed out" in first
+    assert second == "page http://x/1"
+    assert tools.calls == 2
+
+
+def test_session_retries_a_failed_call_on_the_next_turn():
+    tools = FlakyTools()
+    agent = make_agent(tools)
+    session = Session("Test")
+
+    async def turn():
+        async with agent._in_session(session):
+            return await call_tool(agent)
+
+    assert "site unreachable" in asyncio.run(turn())
+    assert asyncio.run(turn()) == "page http://x/1"
+    assert asyncio.run(turn()) == "page http://x/1"
+    assert tools.calls == 2
@@ -0,0 +1,87 @@
+"""Ordering gate of a turn's concurrent tool calls (Agent._auto_function_invocation_filter)."""
+import asyncio
+import os
+import sys
+
+from semantic_kernel.contents import ChatHistory, ChatMessageContent, FunctionCallContent, FunctionResultContent
+from semantic_kernel.contents.utils.author_role import AuthorRole
+from semantic_kernel.functions import kernel_function
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import Agent  # noqa: E402
+
+DEFINITION = {
+    "name": "Test",
+    "service_id": "Test",
+    "endpoint": "https://test.openai.azure.com",
+    "api_key": "test",
+    "api_version": "2024-10-21",
+    "deployment_name": "test",
+    "prefetch": False,
+}
+
+
+class WebTools:
+    @kernel_function(name="fetch")
+    async def fetch(self, url: str) -> str:
+        # Later calls finish first, so only the gate keeps the history in call order
+        await asyncio.sleep(0.05 / (1 + int(url[-1])))
+        return f"page {url}"
+
+
+def run_turn(calls: list[FunctionCallContent]) -> tuple[Agent, ChatHistory]:
+    """Run one turn's calls the way SK's auto-invoke loop does: all at once, against one chat history."""
+    agent = Agent(DEFINITION)
+    agent.kernel.add_plugin(WebTools(), "web")
+    history = ChatHistory()
+    history.add_message(ChatMessageContent(role=AuthorRole.ASSISTANT, items=calls))
+
+    async def turn():
+        await asyncio.wait_for(asyncio.gather(*[
+            agent.kernel.invoke_function_call(function_call=call, chat_history=history, function_call_count=len(calls))
+            for call in calls
+        ]), timeout=3)
+
+    asyncio.run(turn())
+    return agent, history
+
+
+def results(history: ChatHistory) -> list[str]:
+    return [str(item.result) for message in history.messages for item in message.items
+            if isinstance(item, FunctionResultContent)]
+
+
+def fetch(call_id: str | None, n: int) -> FunctionCallContent:
+    return FunctionCallContent(id=call_id, name="web-fetch", arguments=f'{{"url": "http://x/{n}"}}')
+
+
+def test_unknown_tool_does_not_hold_up_later_calls():
+    unknown = FunctionCallContent(id="call_0", name="web-missing", arguments="{}")
+    agent, history = run_turn([unknown, fetch("call_1", 1), fetch("call_2", 2)])
+    found = results(history)
+    assert len(found) == 3
+    assert "not part of the provided tools" in found[0]
+    assert found[1:] == ["page http://x/1", "page http://x/2"]
+    assert set(agent._tool_results) == {"call_1", "call_2"}
+    assert agent._result_orders == {}
+
+
+def test_rejected_call_between_valid_ones():
+    malformed = FunctionCallContent(id="call_1", name="web-fetch", arguments="{}")
+    _, history = run_turn([fetch("call_0", 0), malformed, fetch("call_2", 2), fetch("call_3", 3)])
+    found = results(history)
+    # SK answers the rejected call itself, straight away; the calls that ran keep their order
+    assert len(found) == 4
+    assert sum("Missing required argument" in result for result in found) == 1
+    assert [result for result in found if result.startswith("page")] == [
+        "page http://x/0", "page http://x/2", "page http://x/3",
+    ]
+
+
+def test_calls_without_ids_are_kept_apart():
+    agent, history = run_turn([fetch(None, 0), fetch(None, 1), fetch(None, 2)])
+    assert results(history) == ["page http://x/0", "page http://x/1", "page http://x/2"]
+    assert sorted(tool["results"] for tool in agent._tool_results.values()) == [
+        "page http://x/0", "page http://x/1", "page http://x/2",
+    ]
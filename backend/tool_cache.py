@@ -0,0 +1,83 @@
+import asyncio
+import contextvars
+import json
+
+from batch import normalize_url
+
+# Set around a group of agent runs (e.g. one batch) so they share tool results
+current_tool_cache: contextvars.ContextVar["ToolResultCache | None"] = contextvars.ContextVar("current_tool_cache", default=None)
+
+
+class FailedToolCall(Exception):
+    """Raised by a cached `call` whose tool reported a failure; `result` is what its callers get instead."""
+
+    def __init__(self, result):
+        super().__init__("Tool call failed")
+        self.result = result
+
+
+class ToolResultCache:
+    """Tool call results keyed by plugin, function and arguments.
+
+    Identical calls share one invocation, including calls made concurrently by
+    different agent runs. Failed calls (the `call` raising, e.g. FailedToolCall)
+    are not kept, so a later call can retry.
+    With `max_entries`, the least recently used finished results are dropped beyond it.
+    """
+
+    def __init__(self, max_entries: int | None = None):
+        self.max_entries = max_entries
+        self._entries: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(plugin_name: str | None, function_name: str, arguments, defaults: dict | None = None) -> str:
+        """Cache key of a tool call; `defaults` fills omitted parameters so explicit and implied defaults match."""
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments)
+            except ValueError:
+                pass
+        if isinstance(arguments, dict):
+            arguments = {**(defaults or {}), **arguments}
+            if isinstance(arguments.get("url"), str):
+                arguments["url"] = normalize_url(arguments["url"])
+        return json.dumps([plugin_name, function_name, arguments], sort_keys=True, default=str)
+
+    async def get_or_call(self, key: str, call):
+        future = self._entries.get(key)
+        if future is not None:
+            self.hits += 1
+            # Re-inserted so the dict stays in least recently used order
+            self._entries[key] = self._entries.pop(key)
+            # Shielded so one waiter being cancelled doesn't cancel the result for the others
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._entries[key] = future
+        try:
+            result = await call()
+        except BaseException as e:
+            del self._entries[key]
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()  # waiters re-raise it; don't warn when there are none
+            else:
+                future.cancel()
+            raise
+        future.set_result(result)
+        self._evict()
+        return result
+
+    def _evict(self):
+        if self.max_entries is None:
+            return
+        excess = len(self._entries) - self.max_entries
+        # Calls still in flight have waiters and are never dropped
+        for key in [key for key, future in self._entries.items() if future.done()][:max(excess, 0)]:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
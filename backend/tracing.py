@@ -0,0 +1,169 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Trace of the request being served, inherited by the tasks it starts
+current_trace: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("current_trace", default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class Metrics:
+    """In-process counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._meta: dict[str, tuple[str, str]] = {}
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, Histogram]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, metric: str, amount: float = 1, **labels):
+        series = self._counters.setdefault(metric, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + amount
+
+    def observe(self, metric: str, value: float, **labels):
+        series = self._histograms.setdefault(metric, {})
+        key = tuple(sorted(labels.items()))
+        if key not in series:
+            series[key] = Histogram()
+        series[key].observe(value)
+
+    def _header(self, lines: list[str], name: str, default_kind: str):
+        kind, help_text = self._meta.get(name, (default_kind, name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def render(self, gauges: list[tuple[str, str, dict, float]] = ()) -> str:
+        """Render every series; `gauges` are (name, help, labels, value) samples taken at scrape time."""
+        lines = []
+        for name, series in self._counters.items():
+            self._header(lines, name, "counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(dict(key))} {value:g}")
+        for name, series in self._histograms.items():
+            self._header(lines, name, "histogram")
+            for key, histogram in series.items():
+                labels = dict(key)
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': f'{bound:g}'})} {count}")
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        described = set()
+        for name, help_text, labels, value in gauges:
+            if name not in described:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                described.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {0 if value is None else value:g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("friday_requests_total", "counter", "API requests by endpoint, agent and HTTP status")
+metrics.describe("friday_request_seconds", "histogram", "API request latency by endpoint and agent")
+metrics.describe("friday_span_seconds", "histogram", "Duration of traced operations (llm, tool, reduce, mcp_connect, checkout, agent_build)")
+metrics.describe("friday_llm_tokens_total", "counter", "Model tokens by deployment and type (prompt, completion)")
+metrics.describe("friday_prefetch_total", "counter", "Speculatively prefetched pages the model did (used) or did not (unused) ask for")
+metrics.describe("friday_requests_cancelled_total", "counter", "Agent runs stopped early by reason (deadline, disconnect) and whether partial results were returned")
+metrics.describe("friday_budget_truncated_total", "counter", "Agent runs cut short by their time or token budget, by whether the model still answered")
+metrics.describe("friday_model_turns_total", "counter", "Model turns of tiered agents by role (triage, final) and model")
+
+
+class Trace:
+    """Spans recorded while serving one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: list[dict] = []
+        self.status = "200"
+
+    def add(self, kind: str, name: str, started: float, duration: float, attributes: dict):
+        self.spans.append({
+            "kind": kind,
+            "name": name,
+            "start_ms": round((started - self.started) * 1000, 1),
+            "duration_ms": round(duration * 1000, 1),
+            **attributes,
+        })
+
+    def to_dict(self) -> dict:
+        by_kind: dict[str, dict] = {}
+        tokens = {"prompt": 0, "completion": 0}
+        for item in self.spans:
+            totals = by_kind.setdefault(item["kind"], {"count": 0, "total_ms": 0.0})
+            totals["count"] += 1
+            totals["total_ms"] = round(totals["total_ms"] + item["duration_ms"], 1)
+            tokens["prompt"] += item.get("prompt_tokens") or 0
+            tokens["completion"] += item.get("completion_tokens") or 0
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "by_kind": by_kind,
+            "tokens": tokens,
+            "spans": self.spans,
+        }
+
+
+@contextmanager
+def span(kind: str, name: str, **attributes):
+    """Time a block into the span histogram and, during a request, into its trace.
+
+    Yields the attributes dict so the block can add what it learns (tokens, sizes).
+    """
+    started = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException as e:
+        attributes["error"] = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        metrics.observe("friday_span_seconds", duration, kind=kind, name=name)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add(kind, name, started, duration, attributes)
+
+
+@contextmanager
+def request_trace(endpoint: str, agent_name: str):
+    """Trace one API request and count it in the request metrics."""
+    trace = Trace()
+    token = current_trace.set(trace)
+    try:
+        yield trace
+    except BaseException as e:
+        # HTTPException and friends carry the status code the client will see
+        trace.status = str(getattr(e, "status_code", 500))
+        raise
+    finally:
+        current_trace.reset(token)
+        metrics.inc("friday_requests_total", endpoint=endpoint, agent=agent_name, status=trace.status)
+        metrics.observe("friday_request_seconds", time.perf_counter() - trace.started, endpoint=endpoint, agent=agent_name)
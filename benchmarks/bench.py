@@ -0,0 +1,301 @@
+"""Offline end-to-end benchmark of the agent stack.
+
+Starts the fixture web server, the scripted stand-in LLM, the MCP scraper
+(mcps/main.py) and the backend API (backend/api.py), then drives /api/agent at
+several concurrency levels and reports latency percentiles, throughput and peak RSS.
+No Azure quota or live site is involved.
+
+    python bench.py --concurrency 1,4,16 --requests 32 --output results.json
+    python bench.py --baseline results.json        # compare against an earlier run
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+BACKEND_DIR = os.path.join(REPO_DIR, "backend")
+MCP_DIR = os.path.join(REPO_DIR, "mcps")
+AGENT_NAME = "BENCH"
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def peak_rss_mb(pid: int) -> float | None:
+    """Peak resident set size of a process (Linux VmHWM), in MB."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def wait_for_port(port: int, process: subprocess.Popen, name: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} exited with code {process.returncode}")
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.2)
+    raise TimeoutError(f"{name} did not listen on port {port} within {timeout}s")
+
+
+class Stack:
+    """The processes under test plus their stand-ins, each logging to the run directory."""
+
+    def __init__(self, args):
+        self.args = args
+        self.log_dir = tempfile.mkdtemp(prefix="friday-bench-")
+        self.processes: dict[str, subprocess.Popen] = {}
+        self.fixtures_url = f"http://127.0.0.1:{args.fixtures_port}"
+
+    def _start(self, name: str, command: list[str], cwd: str, port: int, env: dict | None = None):
+        log = open(os.path.join(self.log_dir, f"{name}.log"), "w")
+        process = subprocess.Popen(command, cwd=cwd, stdout=log, stderr=subprocess.STDOUT,
+                                   env={**os.environ, **(env or {})})
+        self.processes[name] = process
+        wait_for_port(port, process, name)
+
+    def _agent_definition(self) -> str:
+        definition = {
+            AGENT_NAME: {
+                # The Azure connector requires an https endpoint; base_url points it at the stand-in
+                "endpoint": "https://benchmark.openai.azure.com",
+                "base_url": f"http://127.0.0.1:{self.args.llm_port}/openai/deployments/bench",
+                "api_key": "benchmark",
+                "api_version": "2024-10-21",
+                "deployment_name": "bench",
+                "system_message": "You are an OSINT expert. Use the web tools and answer with JSON.",
+                "servers": {"web_tools": {"url": f"http://127.0.0.1:{self.args.mcp_port}/mcp", "type": "http"}},
+                "pool_size": max(self.args.concurrency),
+                "pool_max_size": max(self.args.concurrency),
+                "max_concurrent_runs": max(self.args.concurrency),
+                "cache_ttl_seconds": 0,
+            }
+        }
+        path = os.path.join(self.log_dir, "agent_definition.json")
+        with open(path, "w") as f:
+            json.dump(definition, f, indent=2)
+        return path
+
+    def start(self):
+        args = self.args
+        self._start("fixtures", [args.python, os.path.join(BENCH_DIR, "fixture_server.py"),
+                                 "--port", str(args.fixtures_port), "--latency-ms", str(args.fixture_latency_ms)],
+                    BENCH_DIR, args.fixtures_port)
+        self._start("llm", [args.python, os.path.join(BENCH_DIR, "mock_llm.py"), "--port", str(args.llm_port),
+                            "--scenario", args.scenario, "--fixtures-url", self.fixtures_url,
+                            "--latency-scale", str(args.latency_scale)],
+                    BENCH_DIR, args.llm_port)
+        # A fresh HTTP cache per run, so repeated runs start from the same state
+        mcp_env = {"MCP_PORT": str(args.mcp_port), "HTTP_CACHE_DIR": os.path.join(self.log_dir, "http-cache")}
+        if args.no_http_cache:
+            mcp_env["HTTP_CACHE_MAX_BYTES"] = "0"
+        self._start("mcp", [args.mcp_python, "main.py"], MCP_DIR, args.mcp_port, mcp_env)
+        self._start("api", [args.python, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(args.api_port)],
+                    BACKEND_DIR, args.api_port, {"AGENT_DEFINITION_PATH": self._agent_definition()})
+
+    def peak_rss(self) -> dict:
+        return {name: peak_rss_mb(self.processes[name].pid) for name in ("api", "mcp") if name in self.processes}
+
+    def stop(self):
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 120):
+    """Wait until the API's agent pools are warm, which includes connecting to MCP."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get("/api/health")
+            if response.status_code == 200 and response.json().get("agents_warm"):
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError("Backend did not become ready")
+
+
+async def one_request(client: httpx.AsyncClient, endpoint: str, query: str) -> tuple[float, bool, dict]:
+    started = time.perf_counter()
+    params = {"agent_name": AGENT_NAME, "timings": "true"}
+    headers = {"X-Cache-Bypass": "1"}
+    timings = {}
+    try:
+        if endpoint == "agent_stream":
+            ok = False
+            async with client.stream("POST", "/api/agent_stream", params=params, headers=headers,
+                                     json={"query": query}) as response:
+                event = None
+                async for line in response.aiter_lines():
+                    if line.startswith("event: "):
+                        event = line[7:]
+                    elif line.startswith("data: ") and event in ("final", "error"):
+                        ok = event == "final"
+                        timings = json.loads(line[6:]).get("timings", {}) if ok else {}
+        else:
+            response = await client.post("/api/agent", params=params, headers=headers, json={"query": query})
+            ok = response.status_code == 200
+            timings = response.json().get("timings", {}) if ok else {}
+    except httpx.HTTPError:
+        ok = False
+    return time.perf_counter() - started, ok, timings
+
+
+async def run_level(client: httpx.AsyncClient, endpoint: str, concurrency: int, requests: int) -> dict:
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+    latencies, errors, kinds = [], 0, {}
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            # Unique queries so nothing is served from a cache
+            elapsed, ok, timings = await one_request(client, endpoint, f"benchmark c{concurrency} #{i} {time.time_ns()}")
+            if ok:
+                latencies.append(elapsed)
+                for kind, totals in timings.get("by_kind", {}).items():
+                    kinds.setdefault(kind, []).append(totals["total_ms"])
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 1)
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "wall_s": round(wall, 2),
+        "rps": round(len(latencies) / wall, 3) if wall else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_span_ms": {kind: round(sum(values) / len(values), 1) for kind, values in kinds.items()},
+    }
+
+
+def print_report(results: dict, baseline: dict | None):
+    print(f"\nendpoint /api/{results['endpoint']}, scenario {os.path.basename(results['scenario'])}")
+    header = f"{'conc':>5} {'reqs':>5} {'err':>4} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  mean per request"
+    print(header)
+    print("-" * len(header))
+    base_levels = {level["concurrency"]: level for level in (baseline or {}).get("levels", [])}
+    for level in results["levels"]:
+        spans = ", ".join(f"{kind} {value:.0f}ms" for kind, value in sorted(level["mean_span_ms"].items()))
+        print(f"{level['concurrency']:>5} {level['requests']:>5} {level['errors']:>4} {level['rps'] or 0:>8.2f} "
+              f"{level['p50_ms'] or 0:>9.0f} {level['p95_ms'] or 0:>9.0f} {level['p99_ms'] or 0:>9.0f}  {spans}")
+        base = base_levels.get(level["concurrency"])
+        if base:
+            deltas = []
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+                if base.get(key) and level.get(key) is not None:
+                    deltas.append(f"{key} {100 * (level[key] - base[key]) / base[key]:+.1f}%")
+            print(f"{'':>5} vs baseline: {', '.join(deltas)}")
+    rss = ", ".join(f"{name} {value} MB" for name, value in results["peak_rss_mb"].items())
+    print(f"peak RSS: {rss}")
+    if baseline and baseline.get("peak_rss_mb"):
+        print(f"baseline peak RSS: {', '.join(f'{name} {value} MB' for name, value in baseline['peak_rss_mb'].items())}")
+
+
+async def run(args) -> dict:
+    stack = Stack(args)
+    print(f"Starting stack, logs in {stack.log_dir}")
+    try:
+        stack.start()
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.api_port}", timeout=args.timeout) as client:
+            await wait_until_ready(client)
+            if args.warmup:
+                await run_level(client, args.endpoint, min(args.concurrency), args.warmup)
+            levels = []
+            for concurrency in args.concurrency:
+                level = await run_level(client, args.endpoint, concurrency, max(args.requests, concurrency))
+                print(f"concurrency {concurrency}: {level['rps']} rps, p50 {level['p50_ms']} ms, {level['errors']} errors")
+                levels.append(level)
+        return {
+            "endpoint": args.endpoint,
+            "scenario": args.scenario,
+            "latency_scale": args.latency_scale,
+            "fixture_latency_ms": args.fixture_latency_ms,
+            "levels": levels,
+            "peak_rss_mb": stack.peak_rss(),
+            "timestamp": time.time(),
+        }
+    finally:
+        stack.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=2, help="Requests sent before measuring")
+    parser.add_argument("--endpoint", choices=["agent", "agent_stream"], default="agent")
+    parser.add_argument("--scenario", default=os.path.join(BENCH_DIR, "scenarios", "osint.json"))
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Scale the scripted model latencies")
+    parser.add_argument("--fixture-latency-ms", type=float, default=50, help="Latency of the fixture web server")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-request timeout in seconds")
+    parser.add_argument("--python", default=sys.executable, help="Interpreter for the backend and stand-ins")
+    parser.add_argument("--mcp-python", default=None, help="Interpreter for mcps/main.py (defaults to --python)")
+    parser.add_argument("--no-http-cache", action="store_true", help="Fetch every page instead of using the scraper's HTTP cache")
+    parser.add_argument("--api-port", type=int, default=18000)
+    parser.add_argument("--mcp-port", type=int, default=18001)
+    parser.add_argument("--llm-port", type=int, default=19100)
+    parser.add_argument("--fixtures-port", type=int, default=19200)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Results JSON from an earlier run to compare against")
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    args.mcp_python = args.mcp_python or args.python
+    args.scenario = os.path.abspath(args.scenario)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = asyncio.run(run(args))
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
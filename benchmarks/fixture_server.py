@@ -0,0 +1,44 @@
+"""Serve saved HTML pages from benchmarks/fixtures so the scraper never touches live sites.
+
+    python fixture_server.py --port 9200 --latency-ms 50
+"""
+import argparse
+import os
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        # Pages are saved as <name>.html but linked without the extension, like most news sites
+        path = self.translate_path(self.path)
+        if not os.path.exists(path) and os.path.exists(path + ".html"):
+            self.path = self.path.split("?")[0] + ".html"
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to every response")
+    parser.add_argument("--directory", default=FIXTURES_DIR)
+    args = parser.parse_args()
+
+    FixtureHandler.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer((args.host, args.port), partial(FixtureHandler, directory=args.directory))
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Stand-in for an Azure OpenAI chat completions deployment that replays a scripted scenario.
+
+Each request is answered from the scenario turn matching the number of tool-calling
+assistant messages already in the conversation, so concurrent agent runs each walk
+the script independently. Requests without tools (history summarization) get a short
+summary. Both streaming and non-streaming completions are supported.
+
+    python mock_llm.py --port 9100 --scenario scenarios/osint.json --fixtures-url http://127.0.0.1:9200
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STREAM_CHUNK_CHARS = 40
+
+
+def load_scenario(path: str, fixtures_url: str) -> dict:
+    with open(path, "r") as f:
+        raw = f.read()
+    return json.loads(raw.replace("{fixtures}", fixtures_url.rstrip("/")))
+
+
+def create_app(scenario: dict, latency_scale: float = 1.0) -> FastAPI:
+    app = FastAPI()
+    turns = scenario["turns"]
+    stats = {"requests": 0, "streamed": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def pick_turn(body: dict) -> dict:
+        if not body.get("tools"):
+            return {"latency_ms": scenario.get("summary_latency_ms", 300), "prompt_tokens": 500,
+                    "completion_tokens": 80, "content": "Summary of the earlier conversation."}
+        done = sum(1 for message in body["messages"] if message["role"] == "assistant" and message.get("tool_calls"))
+        return turns[min(done, len(turns) - 1)]
+
+    def resolve_tool(body: dict, name: str) -> str:
+        # Kernel functions are advertised as "<plugin>-<function>"
+        for tool in body.get("tools", []):
+            full_name = tool["function"]["name"]
+            if full_name == name or full_name.endswith(f"-{name}"):
+                return full_name
+        return name
+
+    def tool_calls(body: dict, turn: dict) -> list[dict]:
+        return [
+            {
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": resolve_tool(body, call["name"]), "arguments": json.dumps(call.get("arguments", {}))},
+            }
+            for call in turn["tool_calls"]
+        ]
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/{path:path}")
+    async def chat_completions(path: str, request: Request):
+        body = await request.json()
+        turn = pick_turn(body)
+        stats["requests"] += 1
+        stats["prompt_tokens"] += turn.get("prompt_tokens", 0)
+        stats["completion_tokens"] += turn.get("completion_tokens", 0)
+        await asyncio.sleep(turn.get("latency_ms", 0) / 1000 * latency_scale)
+
+        usage = {
+            "prompt_tokens": turn.get("prompt_tokens", 0),
+            "completion_tokens": turn.get("completion_tokens", 0),
+            "total_tokens": turn.get("prompt_tokens", 0) + turn.get("completion_tokens", 0),
+        }
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": body.get("model", "mock")}
+        calls = tool_calls(body, turn) if "tool_calls" in turn else None
+        content = turn.get("content")
+        if isinstance(content, (dict, list)):
+            content = json.dumps(content)
+
+        if body.get("stream"):
+            stats["streamed"] += 1
+
+            def chunk(delta: dict, finish_reason=None, **extra) -> str:
+                payload = {**base, "object": "chat.completion.chunk",
+                           "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+                return f"data: {json.dumps(payload)}\n\n"
+
+            async def events():
+                if calls:
+                    yield chunk({"role": "assistant", "tool_calls": [dict(index=i, **call) for i, call in enumerate(calls)]})
+                    yield chunk({}, "tool_calls")
+                else:
+                    yield chunk({"role": "assistant", "content": ""})
+                    for i in range(0, len(content or ""), STREAM_CHUNK_CHARS):
+                        yield chunk({"content": content[i:i + STREAM_CHUNK_CHARS]})
+                    yield chunk({}, "stop")
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        message = {"role": "assistant", "content": None if calls else content}
+        if calls:
+            message["tool_calls"] = calls
+        return JSONResponse({
+            **base,
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if calls else "stop"}],
+            "usage": usage,
+        })
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--scenario", required=True, help="Scenario JSON with the scripted turns")
+    parser.add_argument("--fixtures-url", default="http://127.0.0.1:9200", help="Replaces {fixtures} in the scenario")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply every scripted latency")
+    args = parser.parse_args()
+
+    app = create_app(load_scenario(args.scenario, args.fixtures_url), args.latency_scale)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# Disk-backed HTTP cache for the scraper
+# Fresh pages are served locally; stale ones are revalidated with ETag / Last-Modified
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Where cached pages are kept, and their total size (0 disables the cache)
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "friday-e", "http"))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds a page is served without asking the site again; per domain (and its subdomains)
+# with e.g. HTTP_CACHE_DOMAIN_TTLS="theguardian.com=120,reuters.com=60"
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", "300"))
+HTTP_CACHE_DOMAIN_TTLS = os.getenv("HTTP_CACHE_DOMAIN_TTLS", "")
+
+
+def parse_domain_ttls(spec: str) -> Dict[str, float]:
+    """Parse "domain=seconds,..." into {domain: seconds}, skipping malformed entries"""
+    ttls: Dict[str, float] = {}
+    for item in spec.split(','):
+        domain, _, seconds = item.partition('=')
+        try:
+            ttls[domain.strip().lower().lstrip('.')] = float(seconds)
+        except ValueError:
+            if item.strip():
+                logger.warning(f"Ignoring malformed HTTP_CACHE_DOMAIN_TTLS entry: {item!r}")
+    return ttls
+
+
+class CachedPage:
+    """A stored response body with the validators needed to revalidate it"""
+
+    def __init__(self, url: str, content_type: str, body: bytes, etag: Optional[str],
+                 last_modified: Optional[str], stored_at: float, ttl: float):
+        self.url = url
+        self.content_type = content_type
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.ttl = ttl
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() - self.stored_at < self.ttl
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers; the site answers 304 if the page has not changed"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def response(self) -> httpx.Response:
+        """The page as a response, so it is decoded and parsed like a fetched one"""
+        headers = {'Content-Type': self.content_type} if self.content_type else {}
+        return httpx.Response(200, headers=headers, content=self.body, request=httpx.Request('GET', self.url))
+
+
+class HTTPCache:
+    """Size-bounded LRU of page bodies in SQLite, shared by all tool calls and kept across restarts"""
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_BYTES,
+                 ttl: float = HTTP_CACHE_TTL, domain_ttls: Optional[Dict[str, float]] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.domain_ttls = parse_domain_ttls(HTTP_CACHE_DOMAIN_TTLS) if domain_ttls is None else domain_ttls
+        self._db: Optional[sqlite3.Connection] = None
+        # Set when the database cannot be opened (e.g. a read-only directory); fetching carries on uncached
+        self.broken = False
+        # One connection used from worker threads, one statement at a time
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stored = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and not self.broken
+
+    def ttl_for(self, url: str) -> float:
+        """Freshness of pages from this URL's host: the most specific configured domain, else the default"""
+        host = (urlparse(url).hostname or '').lower()
+        parts = host.split('.')
+        for i in range(len(parts)):
+            ttl = self.domain_ttls.get('.'.join(parts[i:]))
+            if ttl is not None:
+                return ttl
+        return self.ttl
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = None
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                db = sqlite3.connect(os.path.join(self.directory, 'pages.sqlite3'), check_same_thread=False, isolation_level=None)
+                db.execute('PRAGMA journal_mode=WAL')
+                db.execute(
+                    'CREATE TABLE IF NOT EXISTS pages ('
+                    'url TEXT PRIMARY KEY, content_type TEXT, body BLOB, etag TEXT, last_modified TEXT, '
+                    'stored_at REAL, accessed_at REAL, size INTEGER)'
+                )
+                db.execute('CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)')
+            except (OSError, sqlite3.Error) as e:
+                if db is not None:
+                    db.close()
+                # Logged once: later calls see the cache disabled and do not try again
+                self.broken = True
+                logger.warning(f"HTTP cache disabled, cannot open it in {self.directory}: {e}")
+                raise
+            self._db = db
+        return self._db
+
+    def _get(self, url: str) -> Optional[CachedPage]:
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                'SELECT content_type, body, etag, last_modified, stored_at FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute('UPDATE pages SET accessed_at = ? WHERE url = ?', (time.time(), url))
+        page = CachedPage(url, row[0], row[1], row[2], row[3], row[4], self.ttl_for(url))
+        if page.fresh:
+            self.hits += 1
+        else:
+            self.stale += 1
+        return page
+
+    def _store(self, url: str, response: httpx.Response):
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, response.headers.get('Content-Type', ''), body, response.headers.get('ETag'),
+                 response.headers.get('Last-Modified'), now, now, len(body)),
+            )
+            self.stored += 1
+            # Least recently used first out, until the cache is back under its size
+            total = db.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+            if total > self.max_bytes:
+                for old_url, size in db.execute('SELECT url, size FROM pages ORDER BY accessed_at').fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    db.execute('DELETE FROM pages WHERE url = ?', (old_url,))
+                    total -= size
+                    self.evicted += 1
+
+    def _touch(self, page: CachedPage):
+        page.stored_at = time.time()
+        with self._lock:
+            self._connect().execute(
+                'UPDATE pages SET stored_at = ?, accessed_at = ? WHERE url = ?', (page.stored_at, page.stored_at, page.url)
+            )
+        self.revalidated += 1
+
+    async def get(self, url: str) -> Optional[CachedPage]:
+        """The stored page for this URL, fresh or not; None if there is none"""
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self._get, url)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"HTTP cache read failed for {url}: {e}")
+            return None
+
+    async def store(self, url: str, response: httpx.Response):
+        """Keep a successful response, unless the site forbids storing it"""
+        if not self.enabled or 'no-store' in response.headers.get('Cache-Control', '').lower():
+            return
+        try:
+            await asyncio.to_thread(self._store, url, response)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"HTTP cache write failed for {url}: {e}")
+
+    async def revalidate(self, page: CachedPage):
+        """The site answered 304: the stored page is fresh again"""
+        try:
+            await asyncio.to_thread(self._touch, page)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"HTTP cache update failed for {page.url}: {e}")
+
+    def _size(self) -> tuple:
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages').fetchone()
+
+    async def stats(self) -> dict:
+        """Counters and current size; entries and bytes are None if the database cannot be read"""
+        entries, size = 0, 0
+        if self.enabled:
+            try:
+                entries, size = await asyncio.to_thread(self._size)
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"HTTP cache stats failed: {e}")
+                entries, size = None, None
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale": self.stale,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "stored": self.stored,
+            "evicted": self.evicted,
+        }
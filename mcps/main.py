@@ -3,23 +3,39 @@
 
 import asyncio
 import logging
+import os
 import random
 import time
 import json
+import weakref
+from contextlib import asynccontextmanager
 from fastmcp import FastMCP
 from typing import Dict, List, Any, Optional, Union, Literal
 from urllib.parse import urljoin, urlparse
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import charset_normalizer
+import httpx
 from bs4 import BeautifulSoup
 from pydantic import BaseModel, Field
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 import html
 
+from http_cache import CachedPage, HTTPCache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Connection pool shared by all tool calls: total connections, and idle ones kept alive for reuse
+SCRAPER_MAX_CONNECTIONS = int(os.getenv("SCRAPER_MAX_CONNECTIONS", "100"))
+SCRAPER_MAX_KEEPALIVE = int(os.getenv("SCRAPER_MAX_KEEPALIVE", "20"))
+# Most of a page's <head> read by a metadata-only fetch when </head> has not arrived yet
+SCRAPER_HEAD_MAX_BYTES = int(os.getenv("SCRAPER_HEAD_MAX_BYTES", "131072"))
+# Linked-page enrichment: concurrent fetches server-wide and per host, and how long one tool call waits for them
+ENRICH_MAX_CONCURRENCY = int(os.getenv("ENRICH_MAX_CONCURRENCY", "16"))
+ENRICH_MAX_PER_HOST = int(os.getenv("ENRICH_MAX_PER_HOST", "8"))
+ENRICH_DEADLINE_SECONDS = float(os.getenv("ENRICH_DEADLINE_SECONDS", "8"))
+
 # Create MCP server
 mcp = FastMCP("enhanced-web-scraper")
 
@@ -52,29 +68,53 @@ class StealthConfig:
     }
 
 class EnhancedScraper:
-    """Enhanced web scraper with stealth features and resilience"""
-    
+    """Enhanced web scraper with stealth features and resilience
+
+    Every fetch goes through one shared async client, so concurrent tool calls reuse
+    pooled connections and a slow site never stalls the server's event loop.
+    """
+
+    # Retry strategy of the primary fetch: statuses retried, with exponential backoff between attempts
+    RETRY_TOTAL = 3
+    RETRY_BACKOFF = 1
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
     def __init__(self):
-        self.session = requests.Session()
-        self._setup_session()
-        
-    def _setup_session(self):
-        """Configure session with retry strategy and realistic headers"""
-        # Setup retry strategy
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["HEAD", "GET", "OPTIONS"]
-        )
-        
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
-        
-        # Set default headers
-        self.session.headers.update(StealthConfig.BROWSER_HEADERS)
-        
+        self._client: Optional[httpx.AsyncClient] = None
+        self.cache = HTTPCache()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared client, created on first use inside the server's event loop"""
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(
+                max_connections=SCRAPER_MAX_CONNECTIONS,
+                max_keepalive_connections=SCRAPER_MAX_KEEPALIVE,
+            )
+            # Connection failures are retried by the transport, retryable statuses in _get.
+            # No default headers: each strategy sends its own.
+            self._client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(retries=self.RETRY_TOTAL, limits=limits),
+                follow_redirects=True,
+            )
+        return self._client
+
+    async def _get(self, url: str, retry: bool = False, **kwargs) -> httpx.Response:
+        """GET through the shared pool, retrying overloaded or failing servers when `retry` is set"""
+        attempts = self.RETRY_TOTAL + 1 if retry else 1
+        for attempt in range(attempts):
+            response = await self.client.get(url, **kwargs)
+            if attempt == attempts - 1 or response.status_code not in self.RETRY_STATUSES:
+                return response
+            await asyncio.sleep(self._retry_delay(response, attempt))
+
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """Seconds before the next attempt: the server's Retry-After, else 0, 2, 4... as urllib3 backs off"""
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(float(retry_after), 120.0)
+        return self.RETRY_BACKOFF * (2 ** attempt) if attempt else 0.0
+
     def _get_stealth_headers(self, url: str) -> Dict[str, str]:
         """Generate stealth headers for the request"""
         headers = StealthConfig.BROWSER_HEADERS.copy()
@@ -87,21 +127,31 @@ class EnhancedScraper:
             
         return headers
     
-    def _detect_encoding(self, response: requests.Response) -> str:
-        """Detect proper encoding for the response"""
+    def _detect_encoding(self, response: httpx.Response, content: Optional[bytes] = None) -> str:
+        """Detect proper encoding for the response, or for `content` read from it"""
         # Prefer server-declared encoding if not the default ISO-8859-1
-        if response.encoding and response.encoding.lower() != 'iso-8859-1':
-            return response.encoding
+        encoding = response.charset_encoding
+        if encoding and encoding.lower() != 'iso-8859-1':
+            return encoding
 
-        # Use requests' apparent_encoding (charset-normalizer under the hood)
+        # Detect from the body with charset-normalizer
         try:
-            if getattr(response, 'apparent_encoding', None):
-                return response.apparent_encoding
+            best = charset_normalizer.from_bytes(response.content if content is None else content).best()
+            if best:
+                return best.encoding
         except Exception:
             pass
 
         # Fallback to UTF-8
         return 'utf-8'
+
+    def _decode(self, response: httpx.Response, content: Optional[bytes] = None) -> str:
+        """Response body (or `content` read from it) as text, replacing undecodable bytes"""
+        content = response.content if content is None else content
+        try:
+            return content.decode(self._detect_encoding(response, content), errors='replace')
+        except LookupError:
+            return content.decode('utf-8', errors='replace')
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize extracted text"""
@@ -116,29 +166,34 @@ class EnhancedScraper:
         
         return text.strip()
     
-    def fetch_with_fallback(self, url: str, use_javascript: bool = False) -> BeautifulSoup:
+    async def fetch_with_fallback(self, url: str, use_javascript: bool = False) -> BeautifulSoup:
         """
         Fetch webpage with multiple fallback strategies
         """
+        # Fresh copies come from the HTTP cache; stale ones are revalidated by the first strategy
+        cached = await self.cache.get(url)
+        if cached is not None and cached.fresh:
+            return await asyncio.to_thread(self._parse, cached.response())
+
         errors = []
         
-        # Strategy 1: Enhanced requests with stealth headers
+        # Strategy 1: Pooled client with stealth headers and retries
         try:
-            return self._fetch_with_requests(url)
+            return await self._fetch_stealth(url, cached)
         except Exception as e:
-            errors.append(f"Requests method failed: {str(e)}")
-            logger.warning(f"Requests method failed for {url}: {e}")
+            errors.append(f"Stealth method failed: {str(e)}")
+            logger.warning(f"Stealth method failed for {url}: {e}")
         
-        # Strategy 2: Simplified requests with minimal headers
+        # Strategy 2: Simplified request with minimal headers
         try:
-            return self._fetch_simple(url)
+            return await self._fetch_simple(url)
         except Exception as e:
             errors.append(f"Simple method failed: {str(e)}")
             logger.warning(f"Simple method failed for {url}: {e}")
             
         # Strategy 3: Raw content approach
         try:
-            return self._fetch_raw(url)
+            return await self._fetch_raw(url)
         except Exception as e:
             errors.append(f"Raw method failed: {str(e)}")
             logger.warning(f"Raw method failed for {url}: {e}")
@@ -146,66 +201,208 @@ class EnhancedScraper:
         # If all strategies fail, raise combined error
         raise Exception(f"All fetch strategies failed for {url}. Errors: {'; '.join(errors)}")
     
-    def _fetch_with_requests(self, url: str) -> BeautifulSoup:
+    async def _fetch_stealth(self, url: str, cached: Optional[CachedPage] = None) -> BeautifulSoup:
         """Primary fetch method with stealth features"""
         headers = self._get_stealth_headers(url)
+        if cached is not None:
+            headers.update(cached.validators())
         # Small random delay to appear more human-like without causing timeouts
-        time.sleep(random.uniform(0.1, 0.3))
-
-        response = self.session.get(
-            url,
-            headers=headers,
-            timeout=10,
-            allow_redirects=True,
-            verify=True,
-        )
-        response.raise_for_status()
-
-        # Detect and use proper encoding
-        encoding = self._detect_encoding(response)
-        response.encoding = encoding
-
-        # Parse with multiple parsers as fallback
+        await asyncio.sleep(random.uniform(0.1, 0.3))
+
+        response = await self._get(url, retry=True, headers=headers, timeout=10)
+        if response.status_code == 304 and cached is not None:
+            await self.cache.revalidate(cached)
+            response = cached.response()
+        else:
+            response.raise_for_status()
+            await self.cache.store(url, response)
+
+        # Decoding and parsing are CPU-bound, so they run in a worker thread
+        return await asyncio.to_thread(self._parse, response)
+
+    def _parse(self, response: httpx.Response, content: Optional[bytes] = None) -> BeautifulSoup:
+        """Decode with the detected encoding and parse, trying multiple parsers as fallback"""
+        content = response.content if content is None else content
+        text = self._decode(response, content)
         try:
-            return BeautifulSoup(response.text, 'lxml')
+            return BeautifulSoup(text, 'lxml')
         except Exception:
             try:
-                return BeautifulSoup(response.text, 'html.parser')
+                return BeautifulSoup(text, 'html.parser')
             except Exception:
-                return BeautifulSoup(response.content, 'html.parser')
+                return BeautifulSoup(content, 'html.parser')
 
-    def _fetch_simple(self, url: str) -> BeautifulSoup:
+    async def fetch_head(self, url: str) -> BeautifulSoup:
+        """
+        Fetch only the <head> of a webpage, for its metadata
+        """
+        cached = await self.cache.get(url)
+        if cached is not None and cached.fresh:
+            return await asyncio.to_thread(self._parse_cached_head, cached)
+        try:
+            return await self._fetch_head(url, cached)
+        except Exception as e:
+            logger.warning(f"Head fetch failed for {url}, fetching the full page: {e}")
+            return await self.fetch_with_fallback(url)
+
+    async def _fetch_head(self, url: str, cached: Optional[CachedPage] = None) -> BeautifulSoup:
+        """Stream the page and stop reading at </head> or SCRAPER_HEAD_MAX_BYTES, parsing only that prefix"""
+        headers = self._get_stealth_headers(url)
+        if cached is not None:
+            headers.update(cached.validators())
+        # Small random delay to appear more human-like without causing timeouts
+        await asyncio.sleep(random.uniform(0.1, 0.3))
+
+        head = bytearray()
+        # Leaving the block before the body is read closes the connection instead of downloading the rest
+        async with self.client.stream('GET', url, headers=headers, timeout=10) as response:
+            if response.status_code == 304 and cached is not None:
+                await self.cache.revalidate(cached)
+                return await asyncio.to_thread(self._parse_cached_head, cached)
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                # Search from just before the new chunk, in case the tag straddles two chunks
+                start = max(len(head) - len(b'</head'), 0)
+                head += chunk
+                end = head[start:].lower().find(b'</head')
+                if end != -1:
+                    del head[start + end:]
+                    break
+                if len(head) >= SCRAPER_HEAD_MAX_BYTES:
+                    del head[SCRAPER_HEAD_MAX_BYTES:]
+                    break
+
+        # Only the head was read, so nothing is cached
+        return await asyncio.to_thread(self._parse, response, bytes(head))
+
+    def _parse_cached_head(self, cached: CachedPage) -> BeautifulSoup:
+        """Parse the <head> of a cached page, as _fetch_head would have read it"""
+        head = cached.body[:SCRAPER_HEAD_MAX_BYTES]
+        end = head.lower().find(b'</head')
+        return self._parse(cached.response(), head[:end] if end != -1 else head)
+
+    async def _fetch_simple(self, url: str) -> BeautifulSoup:
         """Simplified fetch method"""
         simple_headers = {
             'User-Agent': random.choice(StealthConfig.USER_AGENTS)
         }
-        response = requests.get(url, headers=simple_headers, timeout=8)
+        response = await self._get(url, headers=simple_headers, timeout=8)
         response.raise_for_status()
+        await self.cache.store(url, response)
 
-        # Auto-detect encoding
-        encoding = self._detect_encoding(response)
-        response.encoding = encoding
-
-        return BeautifulSoup(response.text, 'html.parser')
+        return await asyncio.to_thread(lambda: BeautifulSoup(self._decode(response), 'html.parser'))
 
-    def _fetch_raw(self, url: str) -> BeautifulSoup:
+    async def _fetch_raw(self, url: str) -> BeautifulSoup:
         """Raw fetch method as last resort"""
-        response = requests.get(url, timeout=5)
+        response = await self._get(url, timeout=5)
         response.raise_for_status()
+        await self.cache.store(url, response)
 
         # Use raw content and let BeautifulSoup handle encoding
-        return BeautifulSoup(response.content, 'html.parser')
+        return await asyncio.to_thread(BeautifulSoup, response.content, 'html.parser')
+
+class FetchLimiter:
+    """Caps concurrent fetches in total and per host, across all tool calls"""
+
+    def __init__(self, max_concurrency: int, max_per_host: int):
+        self.max_per_host = max_per_host
+        self._total = asyncio.Semaphore(max_concurrency)
+        # A host's semaphore lives only while some fetch holds or waits on it
+        self._hosts: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = urlparse(url).netloc.lower()
+        host_slots = self._hosts.get(host)
+        if host_slots is None:
+            host_slots = self._hosts[host] = asyncio.Semaphore(self.max_per_host)
+        # Host first, so waiting on a busy site does not hold a slot other sites could use
+        async with host_slots, self._total:
+            yield
 
 # Global scraper instance
 scraper = EnhancedScraper()
+enrich_limiter = FetchLimiter(ENRICH_MAX_CONCURRENCY, ENRICH_MAX_PER_HOST)
 
-def extract_metadata(soup: BeautifulSoup, url: str, include_technical: bool = True) -> Dict[str, Any]:
+# Elements whose links are a page's tags
+TAG_CONTAINERS = ['.tags', '.post-tags', "[rel='tag']"]
+
+class MetaIndex:
+    """Lookup table of a page's metadata tags, built in one pass over the document
+
+    Answers the same as the equivalent soup.find() and soup.select() calls, in
+    document order, without walking the tree again for every field.
+    """
+
+    def __init__(self, soup: BeautifulSoup):
+        self.properties: Dict[str, Optional[str]] = {}
+        self.names: Dict[str, Optional[str]] = {}
+        self.itemprops: Dict[str, Optional[str]] = {}
+        # (rel values, element) of every <link>, in document order
+        self.links: List[tuple] = []
+        self.title = None
+        self.time = None
+        self.images_count = 0
+        self.anchors_count = 0
+        # Elements matching each of TAG_CONTAINERS, in document order
+        self.tag_containers: Dict[str, List[Any]] = {sel: [] for sel in TAG_CONTAINERS}
+        for el in soup.find_all(True):
+            classes = el.get('class')
+            if classes:
+                if 'tags' in classes:
+                    self.tag_containers['.tags'].append(el)
+                if 'post-tags' in classes:
+                    self.tag_containers['.post-tags'].append(el)
+            if el.name == 'meta':
+                content = el.get('content')
+                for attr, table in (('property', self.properties), ('name', self.names), ('itemprop', self.itemprops)):
+                    key = el.get(attr)
+                    if key is not None:
+                        table.setdefault(key, content)
+            elif el.name == 'link':
+                rel = el.get('rel')
+                if rel:
+                    self.links.append((rel, el))
+            elif el.name == 'img':
+                self.images_count += 1
+            elif el.name == 'a':
+                self.anchors_count += 1
+            elif el.name == 'title':
+                if self.title is None:
+                    self.title = el
+            elif el.name == 'time':
+                if self.time is None:
+                    self.time = el
+            # [rel='tag'] compares the whole attribute value
+            rel = el.get('rel')
+            if rel and (' '.join(rel) if isinstance(rel, list) else rel) == 'tag':
+                self.tag_containers["[rel='tag']"].append(el)
+
+    def meta(self, property_name: str = None, name: str = None, itemprop: str = None) -> Optional[str]:
+        """Cleaned content of the first <meta> with this property, else name, else itemprop"""
+        for table, key in ((self.properties, property_name), (self.names, name), (self.itemprops, itemprop)):
+            if key:
+                content = table.get(key)
+                if content:
+                    return scraper._clean_text(content)
+        return None
+
+    def link(self, rel: str) -> Optional[Any]:
+        """First <link> whose rel contains `rel`, as soup.find('link', rel=lambda v: v and rel in v) matches"""
+        for values, el in self.links:
+            if any(rel in value for value in values) or rel in ' '.join(values):
+                return el
+        return None
+
+def extract_metadata(soup: BeautifulSoup, url: str, include_technical: bool = True,
+                     index: Optional[MetaIndex] = None) -> Dict[str, Any]:
     """Extract page metadata including Open Graph, Twitter, and basic tags.
 
     Args:
         soup: BeautifulSoup document
         url: Page URL used for resolving relative links
         include_technical: If True, include extra technical metadata
+        index: MetaIndex of the document, if the caller already built one
 
     Returns:
         Dict with at least 'title' and 'description'
@@ -215,26 +412,14 @@ def extract_metadata(soup: BeautifulSoup, url: str, include_technical: bool = Tr
             return None
         return urljoin(url, href)
 
-    def get_meta(property_name: str = None, name: str = None, itemprop: str = None) -> Optional[str]:
-        if property_name:
-            el = soup.find('meta', property=property_name)
-            if el and el.get('content'):
-                return scraper._clean_text(el.get('content'))
-        if name:
-            el = soup.find('meta', attrs={'name': name})
-            if el and el.get('content'):
-                return scraper._clean_text(el.get('content'))
-        if itemprop:
-            el = soup.find('meta', attrs={'itemprop': itemprop})
-            if el and el.get('content'):
-                return scraper._clean_text(el.get('content'))
-        return None
+    index = index or MetaIndex(soup)
+    get_meta = index.meta
 
-    title = get_meta('og:title') or (scraper._clean_text(soup.title.string) if soup.title and soup.title.string else '')
+    title = get_meta('og:title') or (scraper._clean_text(index.title.string) if index.title and index.title.string else '')
     description = get_meta('og:description') or get_meta(name='description') or ''
     site_name = get_meta('og:site_name') or urlparse(url).netloc
     canonical = None
-    link_canon = soup.find('link', rel=lambda v: v and 'canonical' in v)
+    link_canon = index.link('canonical')
     if link_canon and link_canon.get('href'):
         canonical = abs_url(link_canon.get('href'))
     language = None
@@ -243,14 +428,14 @@ def extract_metadata(soup: BeautifulSoup, url: str, include_technical: bool = Tr
     # favicon
     favicon = None
     for rel in ('icon', 'shortcut icon', 'apple-touch-icon'):
-        link = soup.find('link', rel=lambda v: v and rel in v)
+        link = index.link(rel)
         if link and link.get('href'):
             favicon = abs_url(link.get('href'))
             break
     author = get_meta(name='author') or get_meta(property_name='article:author')
     published = get_meta(property_name='article:published_time') or get_meta(name='article:published_time') or get_meta(name='date') or get_meta(name='dc.date') or get_meta(itemprop='datePublished')
     if not published:
-        t = soup.find('time')
+        t = index.time
         if t and t.get('datetime'):
             published = scraper._clean_text(t.get('datetime'))
 
@@ -273,8 +458,8 @@ def extract_metadata(soup: BeautifulSoup, url: str, include_technical: bool = Tr
     kw = get_meta(name='keywords')
     if kw:
         tags.extend([scraper._clean_text(x) for x in kw.split(',') if x.strip()])
-    for container_sel in ['.tags', '.post-tags', "[rel='tag']"]:
-        for el in soup.select(container_sel):
+    for container_sel in TAG_CONTAINERS:
+        for el in index.tag_containers[container_sel]:
             if el.name == 'a':
                 t = scraper._clean_text(el.get_text())
                 if t:
@@ -314,8 +499,8 @@ def extract_metadata(soup: BeautifulSoup, url: str, include_technical: bool = Tr
 
     if include_technical:
         # simple technical info
-        images_count = len(soup.find_all('img'))
-        links_count = len(soup.find_all('a'))
+        images_count = index.images_count
+        links_count = index.anchors_count
         content_type = None
         charset = soup.original_encoding if hasattr(soup, 'original_encoding') else None
         metadata.update({
@@ -329,6 +514,13 @@ def extract_metadata(soup: BeautifulSoup, url: str, include_technical: bool = Tr
 
     return metadata
 
+async def fetch_link_description(link_url: str) -> str:
+    """Meta description, or else title, of a linked page, read from its <head> alone"""
+    async with enrich_limiter.slot(link_url):
+        linked_soup = await scraper.fetch_head(link_url)
+    meta = await asyncio.to_thread(extract_metadata, linked_soup, link_url, False)
+    return scraper._clean_text(meta.get('description') or meta.get('title') or '')
+
 @mcp.tool()
 async def list_links_with_descriptions_tool(
         url: str = Field(..., description="The page URL to scan for links"),
@@ -350,7 +542,7 @@ async def list_links_with_descriptions_tool(
     """
     try:
         # Fetch and parse the base page
-        soup = scraper.fetch_with_fallback(url)
+        soup = await scraper.fetch_with_fallback(url)
 
         links = soup.find_all('a', href=True)
         results: dict[str, str] = {}
@@ -421,27 +613,30 @@ async def list_links_with_descriptions_tool(
             if description or fetch_linked_pages:
                 ordered.append((normalized, description))
 
-        # Optional: enrich by fetching linked pages (limited)
+        # Optional: enrich by fetching linked pages (limited), concurrently until the deadline
         if fetch_linked_pages and ordered:
             to_enrich = ordered[: min(fetch_limit, len(ordered))]
-            for i, (link_url, description) in enumerate(to_enrich):
+            pending = {
+                link_url: asyncio.create_task(fetch_link_description(link_url))
+                for link_url, description in to_enrich
                 # Only fetch if we don't already have a meaningful description
-                if description and len(description) >= 15:
-                    continue
+                if not (description and len(description) >= 15)
+            }
+            enriched_map: dict[str, str] = {}
+            if pending:
                 try:
-                    linked_soup = scraper.fetch_with_fallback(link_url)
-                    meta = extract_metadata(linked_soup, link_url, include_technical=False)
-                    meta_desc = meta.get('description') or ''
-                    meta_title = meta.get('title') or ''
-                    enriched = scraper._clean_text(meta_desc or meta_title)
-                    if enriched:
-                        to_enrich[i] = (link_url, enriched)
-                except Exception:
+                    done, not_done = await asyncio.wait(pending.values(), timeout=ENRICH_DEADLINE_SECONDS)
+                finally:
+                    for task in pending.values():
+                        task.cancel()
+                if not_done:
+                    logger.info(f"Enrichment deadline reached for {url}: {len(not_done)} of {len(pending)} linked pages unfinished")
+                for link_url, task in pending.items():
                     # Ignore fetch errors for individual links
-                    pass
+                    if task in done and task.exception() is None and task.result():
+                        enriched_map[link_url] = task.result()
 
             # Merge enriched back
-            enriched_map = {u: d for (u, d) in to_enrich}
             ordered = [(u, (enriched_map.get(u) or d)) for (u, d) in ordered]
 
         # Build mapping - only include links with meaningful descriptions
@@ -462,7 +657,7 @@ async def extract_article_content_tool(
 ) -> Dict[str, Any]:
     """Extract main article content and return a structured dict with text, images, links, and metadata."""
     try:
-        soup = scraper.fetch_with_fallback(url, use_javascript=use_javascript)
+        soup = await scraper.fetch_with_fallback(url, use_javascript=use_javascript)
 
         # Utility: absolute URL
         def abs_url(href: Optional[str]) -> Optional[str]:
@@ -470,60 +665,16 @@ async def extract_article_content_tool(
                 return None
             return urljoin(url, href)
 
-        # Title priority: og:title -> <title>
-        def get_title() -> str:
-            og = soup.find("meta", property="og:title")
-            if og and og.get("content"):
-                return scraper._clean_text(og.get("content"))
-            if soup.title and soup.title.string:
-                return scraper._clean_text(soup.title.string)
-            return ""
-
-        # Description priority: og:description -> meta[name=description]
-        def get_description() -> str:
-            og = soup.find("meta", property="og:description")
-            if og and og.get("content"):
-                return scraper._clean_text(og.get("content"))
-            md = soup.find("meta", attrs={"name": "description"})
-            if md and md.get("content"):
-                return scraper._clean_text(md.get("content"))
-            return ""
-
-        # Site name
-        def get_site_name() -> str:
-            og = soup.find("meta", property="og:site_name")
-            if og and og.get("content"):
-                return scraper._clean_text(og.get("content"))
-            return urlparse(url).netloc
-
-        # Canonical
-        def get_canonical() -> Optional[str]:
-            link = soup.find("link", rel=lambda v: v and "canonical" in v)
-            return abs_url(link.get("href")) if link and link.get("href") else None
-
-        # Language
-        def get_lang() -> Optional[str]:
-            html_tag = soup.find("html")
-            if html_tag and html_tag.get("lang"):
-                return html_tag.get("lang").lower()
-            return None
+        # Page metadata, shared with the link tool's enrichment, from one pass over the document
+        index = MetaIndex(soup)
+        page_meta = extract_metadata(soup, url, include_technical=False, index=index)
 
-        # Favicon
-        def get_favicon() -> Optional[str]:
-            for rel in ("icon", "shortcut icon", "apple-touch-icon"):
-                link = soup.find("link", rel=lambda v: v and rel in v)
-                if link and link.get("href"):
-                    return abs_url(link.get("href"))
-            return None
-
-        # Author
+        # Author: meta tags, then bylines in the page
         def get_author() -> Optional[str]:
-            for sel in [
-                'meta[name="author"]',
-                'meta[property="article:author"]',
-                '[itemprop="author"]',
-                '.byline', '.author', '.post-author'
-            ]:
+            author = index.meta(name="author") or index.meta(property_name="article:author")
+            if author:
+                return author
+            for sel in ['[itemprop="author"]', '.byline', '.author', '.post-author']:
                 el = soup.select_one(sel)
                 if el:
                     content = el.get("content") if el.name == "meta" else el.get_text()
@@ -532,25 +683,6 @@ async def extract_article_content_tool(
                         return content
             return None
 
-        # Published date
-        def get_published() -> Optional[str]:
-            meta_props = [
-                ('meta', {"property": "article:published_time"}),
-                ('meta', {"name": "article:published_time"}),
-                ('meta', {"name": "date"}),
-                ('meta', {"name": "dc.date"}),
-                ('meta', {"itemprop": "datePublished"}),
-            ]
-            for tag, attrs in meta_props:
-                el = soup.find(tag, attrs=attrs)
-                if el and el.get("content"):
-                    return scraper._clean_text(el.get("content"))
-            # <time datetime>
-            t = soup.find("time")
-            if t and t.get("datetime"):
-                return scraper._clean_text(t.get("datetime"))
-            return None
-
         # Detect primary content container
         content_selectors = [
             'article', '[role="main"]', 'main', '.content', '#content',
@@ -622,42 +754,23 @@ async def extract_article_content_tool(
                 "title": a.get("title") or "",
             })
 
-        # Tags/keywords
-        tags: List[str] = []
-        mk = soup.find("meta", attrs={"name": "keywords"})
-        if mk and mk.get("content"):
-            tags.extend([scraper._clean_text(x) for x in mk.get("content").split(",") if x.strip()])
-        for container_sel in [".tags", ".post-tags", "[rel='tag']"]:
-            for el in soup.select(container_sel):
-                if el.name == "a":
-                    t = scraper._clean_text(el.get_text())
-                    if t:
-                        tags.append(t)
-                else:
-                    for a in el.find_all("a"):
-                        t = scraper._clean_text(a.get_text())
-                        if t:
-                            tags.append(t)
-        # Dedupe tags
-        tags = list(dict.fromkeys(tags))
-
         # Build metadata
         metadata: Dict[str, Any] = {
-            "title": get_title(),
-            "description": get_description(),
-            "site_name": get_site_name(),
-            "canonical": get_canonical(),
-            "language": get_lang(),
-            "favicon": get_favicon(),
+            "title": page_meta["title"],
+            "description": page_meta["description"],
+            "site_name": page_meta["site_name"],
+            "canonical": page_meta["canonical"],
+            "language": page_meta["language"],
+            "favicon": page_meta["favicon"],
             "author": get_author(),
-            "published": get_published(),
-            "tags": tags,
+            "published": page_meta["published"],
+            "tags": page_meta["tags"],
         }
 
         # Final structured result
         result: Dict[str, Any] = {
             "url": url,
-            "title": metadata.get("title") or get_title(),
+            "title": metadata["title"],
             "text": text,
             "excerpt": excerpt,
             "images": images,
@@ -678,6 +791,12 @@ async def extract_article_content_tool(
         }
 
 
+@mcp.custom_route("/cache/stats", methods=["GET"])
+async def cache_stats(request: Request) -> JSONResponse:
+    """Hit/miss counters and size of the scraper's HTTP cache"""
+    return JSONResponse(await scraper.cache.stats())
+
+
 if __name__ == "__main__":
 
-    mcp.run(transport='streamable-http', host='0.0.0.0', port=8001)
+    mcp.run(transport='streamable-http', host='0.0.0.0', port=int(os.getenv("MCP_PORT", "8001")))
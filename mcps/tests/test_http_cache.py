@@ -0,0 +1,66 @@
+"""The scraper keeps fetching when its HTTP cache cannot be opened (http_cache.HTTPCache)."""
+import asyncio
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_cache import HTTPCache  # noqa: E402
+from main import EnhancedScraper  # noqa: E402
+
+PAGE = b"<html><head><title>Fetched</title></head><body><p>Body</p></body></html>"
+
+
+def scraper_with_cache_in(directory: str) -> tuple[EnhancedScraper, list]:
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url)
+        return httpx.Response(200, headers={"Content-Type": "text/html"}, content=PAGE)
+
+    scraper = EnhancedScraper()
+    scraper.cache = HTTPCache(directory=directory)
+    scraper._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return scraper, requests
+
+
+def test_fetch_succeeds_when_the_cache_directory_is_unwritable(tmp_path):
+    # A path below a regular file cannot be created, whoever runs the test
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    scraper, requests = scraper_with_cache_in(str(blocker / "http"))
+
+    async def fetch():
+        try:
+            page = await scraper.fetch_with_fallback("http://example.com/a")
+            head = await scraper.fetch_head("http://example.com/b")
+            again = await scraper.fetch_with_fallback("http://example.com/a")
+            return page, head, again, await scraper.cache.stats()
+        finally:
+            await scraper.client.aclose()
+
+    page, head, again, stats = asyncio.run(fetch())
+    assert page.title.string == head.title.string == again.title.string == "Fetched"
+    # Nothing was cached, so the repeated fetch went to the site again
+    assert len(requests) == 3
+    assert scraper.cache.broken
+    assert stats["enabled"] is False
+
+
+def test_fetch_is_served_from_a_working_cache(tmp_path):
+    scraper, requests = scraper_with_cache_in(str(tmp_path / "http"))
+
+    async def fetch():
+        try:
+            for _ in range(2):
+                await scraper.fetch_with_fallback("http://example.com/a")
+            return await scraper.cache.stats()
+        finally:
+            await scraper.client.aclose()
+
+    stats = asyncio.run(fetch())
+    assert len(requests) == 1
+    assert stats["enabled"] is True
+    assert stats["entries"] == 1
@@ -14,7 +14,27 @@ def fetch_agents(BACKEND_URL):
         return []
     
 
-@st.cache_data()
+def _parse_response(result):
+    # Parse response as JSON if it's a string, otherwise keep as dict
+    response_data = result.get("response")
+    if isinstance(response_data, str):
+        try:
+            parsed_response = json.loads(response_data)
+            # Check if the parsed response contains an error
+            if isinstance(parsed_response, dict) and "error" in parsed_response:
+                st.error(f"Backend error: {parsed_response['error']}")
+                result['response_json'] = {}
+            else:
+                result['response_json'] = parsed_response
+        except json.JSONDecodeError:
+            st.error("Failed to decode response JSON")
+            result['response_json'] = response_data
+    else:
+        result['response_json'] = response_data
+    return result
+
+
+@st.cache_data(ttl=300)  # the backend caches per agent TTL; keep this copy short-lived
 def run_agent(query, selected_agent, BACKEND_URL):
     try:
         # Make request to the agent endpoint
@@ -25,23 +45,29 @@ def run_agent(query, selected_agent, BACKEND_URL):
             params={"agent_name": selected_agent}
         )
         response.raise_for_status()
-        result = response.json()
-        # Parse response as JSON if it's a string, otherwise keep as dict
-        response_data = result.get("response")
-        if isinstance(response_data, str):
-            try:
-                parsed_response = json.loads(response_data)
-                # Check if the parsed response contains an error
-                if isinstance(parsed_response, dict) and "error" in parsed_response:
-                    st.error(f"Backend error: {parsed_response['error']}")
-                    result['response_json'] = {}
-                else:
-                    result['response_json'] = parsed_response
-            except json.JSONDecodeError:
-                st.error("Failed to decode response JSON")
-                result['response_json'] = response_data
-        else:
-            result['response_json'] = response_data
+        result = _parse_response(response.json())
+
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error processing query: {e}")
+        result = {"response_json": {}}
+    return result
+
+
+@st.cache_data(ttl=300)
+def run_agent_batch(query, sources, topics, selected_agent, BACKEND_URL):
+    """Run one agent per source x topic on the backend and get the merged results."""
+    try:
+        payload = {"query": query, "sources": list(sources), "topics": list(topics)}
+        response = requests.post(
+            f"{BACKEND_URL}/api/agent_batch",
+            json=payload,
+            params={"agent_name": selected_agent}
+        )
+        response.raise_for_status()
+        result = _parse_response(response.json())
+        failed = [run for run in result.get("runs", []) if run.get("status") != "ok"]
+        if failed:
+            st.warning(f"{len(failed)} of {len(result['runs'])} searches failed")
 
     except requests.exceptions.RequestException as e:
         st.error(f"Error processing query: {e}")
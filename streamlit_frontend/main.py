@@ -1,5 +1,5 @@
 import streamlit as st
-from functions import fetch_agents, run_agent, show_results
+from functions import fetch_agents, run_agent, run_agent_batch, show_results
 
 st.title("FRIDAY-E")
 
@@ -44,13 +44,14 @@ if agents:
         selected_locations = st.multiselect("Select Locations", locations)
         selected_topics = st.multiselect("Select Topics", topics)
 
-        if selected_locations or selected_topics:
-            query = f"Answer the user's query: {query}. They would like to focus on articles from: {', '.join(selected_locations)}, which are related to their query and include the following topics: {', '.join(selected_topics)}. Do not include things not related to these topics."
-
         if st.button("Submit Query"):
-            if query:
+            if query or selected_locations or selected_topics:
                 with st.spinner("Processing your query..."):
-                    result = run_agent(query, selected_agent, BACKEND_URL)
+                    if selected_locations or selected_topics:
+                        # One concurrent agent run per location x topic, merged by the backend
+                        result = run_agent_batch(query, selected_locations, selected_topics, selected_agent, BACKEND_URL)
+                    else:
+                        result = run_agent(query, selected_agent, BACKEND_URL)
                     if result:
                         # Store result in session state
 